@@ -3,42 +3,174 @@
 #include <string.h>
 #include <time.h>
 
-// Very small placeholder simulation: produces a few moving glyphs.
+// Port of RefSim in src/simbridge.py: one stream per column, same rules and
+// the same SplitMix64 draws, so frames match the Python reference exactly.
+
+#define STREAM_LEN_MIN 10
+#define STREAM_LEN_MAX 42
+#define BASE_SPEED_MIN 4.0
+#define BASE_SPEED_MAX 12.0
+
+typedef struct {
+    double y, speed;
+    int length;
+    bool active;
+    int last_head;
+    int head;                       // ring offset of trail index 0
+    int ring[STREAM_LEN_MAX];
+} Stream;
+
+static Stream *g_streams = NULL;
 static GlyphInstance *g_instances = NULL;
 static int g_count = 0;
 static int g_w = 80, g_h = 25;
 
+static uint64_t g_rng;
+static bool g_seeded = false;
+static double g_density = 0.75;
+static int g_glyphs = 256;
+
+// intensity tier by (length, trail index), as build_intensity_lut() in livemtrx.py
+static unsigned char g_lut[STREAM_LEN_MAX + 1][STREAM_LEN_MAX];
+
+static uint64_t rng_next(void) {
+    uint64_t z = (g_rng += 0x9E3779B97F4A7C15ull);
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ull;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBull;
+    return z ^ (z >> 31);
+}
+
+static double rng_random(void) {
+    return (double)(rng_next() >> 11) * (1.0 / 9007199254740992.0);
+}
+
+static int rng_below(int n) {
+    return (int)(rng_next() % (uint64_t)n);
+}
+
+static double rng_uniform(double a, double b) {
+    return a + (b - a) * rng_random();
+}
+
+static int next_glyph(void) {
+    return rng_below(g_glyphs);
+}
+
+static void respawn(Stream *s) {
+    int length = STREAM_LEN_MIN + rng_below(STREAM_LEN_MAX - STREAM_LEN_MIN + 1);
+    s->active = rng_random() < g_density;
+    s->head = 0;
+    for (int i = 0; i < length; ++i) s->ring[i] = next_glyph();
+    s->length = length;
+    s->y = rng_uniform(-length * 2.0, 0.0);
+    s->speed = rng_uniform(BASE_SPEED_MIN, BASE_SPEED_MAX);
+    s->last_head = -10000;
+}
+
+void sim_configure(uint64_t seed, double density, int glyph_count) {
+    g_rng = seed;
+    g_seeded = true;
+    g_density = density;
+    g_glyphs = glyph_count > 0 ? glyph_count : 1;
+}
+
 bool sim_init(int width, int height) {
     g_w = width;
     g_h = height;
-    srand((unsigned)time(NULL));
-    g_count = 128;
-    g_instances = calloc(g_count, sizeof(GlyphInstance));
-    for (int i = 0; i < g_count; ++i) {
-        g_instances[i].x = rand() % g_w;
-        g_instances[i].y = rand() % g_h;
-        g_instances[i].glyph = rand() % 256;
-        g_instances[i].tier = rand() % 3;
+    if (!g_seeded) g_rng = (uint64_t)time(NULL);
+    for (int n = 0; n <= STREAM_LEN_MAX; ++n) {
+        for (int i = 0; i < n; ++i) {
+            g_lut[n][i] = i == 0 ? 0 : i <= 2 ? 1 : i <= (int)(n * 0.55) ? 2 : 3;
+        }
+    }
+    // a second sim_init (e.g. on resize) replaces the previous grid
+    sim_shutdown();
+    g_streams = calloc(g_w, sizeof(Stream));
+    // one instance per cell at most: a column holds one trail
+    g_instances = calloc((size_t)g_w * g_h, sizeof(GlyphInstance));
+    if (!g_streams || !g_instances) {
+        sim_shutdown();
+        return false;
     }
+    for (int x = 0; x < g_w; ++x) respawn(&g_streams[x]);
+    g_count = 0;
     return true;
 }
 
 void sim_shutdown(void) {
+    free(g_streams);
     free(g_instances);
+    g_streams = NULL;
     g_instances = NULL;
     g_count = 0;
 }
 
 void sim_step(double dt) {
-    // placeholder: nudge glyphs down
-    for (int i = 0; i < g_count; ++i) {
-        g_instances[i].y += (int)(dt * 6.0);
-        if (g_instances[i].y >= g_h) g_instances[i].y = 0;
+    for (int x = 0; x < g_w; ++x) {
+        Stream *s = &g_streams[x];
+        if (!s->active) {
+            // occasionally (re)activate with a fresh spawn
+            if (rng_random() < g_density * 0.02) {
+                respawn(s);
+                s->active = true;
+            }
+            continue;
+        }
+
+        s->y += s->speed * dt;
+        int head = (int)s->y;
+        if (head != s->last_head) {
+            int steps = head - s->last_head;
+            if (steps > 0) {
+                if (steps > s->length) steps = s->length;
+                for (int i = 0; i < steps; ++i) {
+                    s->head = (s->head + STREAM_LEN_MAX - 1) % STREAM_LEN_MAX;
+                    s->ring[s->head] = next_glyph();
+                }
+            }
+            s->last_head = head;
+        }
+
+        // reset if fully offscreen
+        if (head - s->length > g_h + 2) {
+            if (rng_random() < g_density) {
+                respawn(s);
+                s->active = true;
+            } else {
+                s->active = false;
+            }
+            continue;
+        }
+
+        // occasional small mutations so tails aren't perfectly static
+        if (rng_random() < 0.06 && s->length > 1) {
+            int half = (int)(s->length * 0.5);
+            int idx = rng_below(half > 1 ? half : 1);
+            s->ring[(s->head + idx) % STREAM_LEN_MAX] = next_glyph();
+        } else if (rng_random() < 0.015) {
+            int idx = rng_below(s->length);
+            s->ring[(s->head + idx) % STREAM_LEN_MAX] = next_glyph();
+        }
     }
 }
 
 SimFrame sim_get_frame(void) {
+    int k = 0;
+    for (int x = 0; x < g_w; ++x) {
+        const Stream *s = &g_streams[x];
+        if (!s->active) continue;
+        int head = (int)s->y;
+        for (int i = 0; i < s->length; ++i) {
+            int y = head - i;
+            if (y < 0 || y >= g_h) continue;
+            GlyphInstance *gi = &g_instances[k++];
+            gi->x = x;
+            gi->y = y;
+            gi->glyph = s->ring[(s->head + i) % STREAM_LEN_MAX];
+            gi->tier = g_lut[s->length][i];
+        }
+    }
+    g_count = k;
     SimFrame f = { .instances = g_instances, .count = g_count };
     return f;
 }
-
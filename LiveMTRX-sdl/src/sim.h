@@ -2,7 +2,7 @@
 #include <stdint.h>
 #include <stdbool.h>
 
-// Minimal sim API (expand later)
+// Stream simulation, a port of RefSim in src/simbridge.py (which checks it)
 
 typedef struct {
     int x, y;    // integer positions for the GPU
@@ -16,8 +16,11 @@ typedef struct {
     int count;
 } SimFrame;
 
+// Optional, before sim_init: RNG seed, stream density and atlas glyph count
+// (defaults: seeded from the clock, 0.75, 256)
+void sim_configure(uint64_t seed, double density, int glyph_count);
+// May be called again (e.g. on resize); the previous grid is freed
 bool sim_init(int width, int height);
 void sim_shutdown(void);
 void sim_step(double dt);
 SimFrame sim_get_frame(void);
-
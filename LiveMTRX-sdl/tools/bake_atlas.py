@@ -6,62 +6,201 @@ Usage:
     ./bake_atlas.py --font /Library/Fonts/SFMono-Regular.otf --size 20 --cell 20 --out assets/glyph_atlas.png --map assets/glyph_map.json
 
 Generates a grid atlas of chosen glyphs and writes a JSON mapping with indices.
+By default the glyphs are glyphs.ALL_GLYPHS from src/glyphs.py. Glyphs the
+font cannot draw (an empty tile, or the same tile as the font's .notdef) are
+left out of the atlas and listed under "dropped" in the map.
+
+Glyphs are rasterized once per (font file contents, size, cell) and kept in
+a cache (--cache, default ~/.cache/livemtrx/atlas): later runs only render
+glyphs that are not cached yet, across a process pool (--jobs). Next to the
+PNG a raw atlas (--out with .bin) is written for loaders that want to mmap
+it instead of decoding a PNG:
+
+    header   BIN_HEADER: magic, cell, count, header size
+    tiles    count * cell * cell bytes of coverage (alpha), one tile after
+             another in mapping order
+
+--scales 1,2 bakes one atlas per scale (size and cell multiplied), the
+extra ones named glyph_atlas@2x.png / glyph_map@2x.json / glyph_atlas@2x.bin.
 """
 import argparse
+import hashlib
 import json
-from PIL import Image, ImageDraw, ImageFont
 import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+import glyphs  # noqa: E402
+
+# Shared glyph registry (src/glyphs.py): every glyph any renderer may draw
+DEFAULT_GLYPHS = glyphs.ALL_GLYPHS
+
+# Codepoint no font maps: its tile is the font's .notdef (tofu) rendering
+NOTDEF_PROBE = '\U0010ffff'
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'livemtrx', 'atlas')
+
+# Bump when rasterize() changes, so cached tiles from older bakers are not reused
+RASTER_VERSION = 1
+
+# Raw atlas header: magic, cell, glyph count, offset of the first tile
+BIN_MAGIC = b'LMATLAS1'
+BIN_HEADER = struct.Struct('<8sIII')
+
+# Cache record: codepoint, then cell * cell coverage bytes
+_CACHE_REC = struct.Struct('<I')
+
+# Below this many glyphs to render, a pool costs more than it saves
+POOL_MIN_GLYPHS = 64
+
+_font = None
+
+
+def _init_worker(font_path: str, font_size: int):
+    global _font
+    _font = ImageFont.truetype(font_path, font_size)
+
+
+def rasterize(font, ch: str, cell: int) -> bytes:
+    """Coverage of ch centred in a cell x cell tile, as cell * cell bytes."""
+    img = Image.new('L', (cell, cell), 0)
+    draw = ImageDraw.Draw(img)
+    # center glyph in cell
+    bbox = font.getbbox(ch)
+    gw = bbox[2] - bbox[0]
+    gh = bbox[3] - bbox[1]
+    gx = (cell - gw) // 2 - bbox[0]
+    gy = (cell - gh) // 2 - bbox[1]
+    draw.text((gx, gy), ch, font=font, fill=255)
+    return img.tobytes()
 
-DEFAULT_GLYPHS = (
-    # ASCII
-    "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    "abcdefghijklmnopqrstuvwxyz"
-    "0123456789"
-    "@#$%&*+=-:;.,!?/\\|[]{}()<>"
-    # Katakana subset
-    "ｱｲｳｴｵｶｷｸｹｺｻｼｽｾｿﾀﾁﾂﾃﾄﾅﾆﾇﾈﾉ"
-    # Greek subset
-    "ΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩ"
-    "αβγδεζηθικλμνξοπρστυφχψω"
-    # Box drawing
-    "│┃━─┌┐└┘├┤┬┴┼╭╮╰╯"
-)
-
-
-def bake(font_path: str, font_size: int, cell: int, cols: int, out_png: str, out_json: str, glyphs: str):
-    font = ImageFont.truetype(font_path, font_size)
-    rows = (len(glyphs) + cols - 1) // cols
+
+def _rasterize_chunk(chars: str, cell: int):
+    return [(ch, rasterize(_font, ch, cell)) for ch in chars]
+
+
+def font_hash(font_path: str) -> str:
+    h = hashlib.sha256()
+    with open(font_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+class GlyphCache:
+    """
+    Rendered tiles for one (font hash, size, cell), stored as one append-only
+    file of (codepoint, tile) records.
+    """
+    def __init__(self, cache_dir: str, fhash: str, font_size: int, cell: int):
+        self.path = os.path.join(cache_dir, f'{fhash}-{font_size}-{cell}-v{RASTER_VERSION}.tiles')
+        self.tile_size = cell * cell
+        self.tiles = {}
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        rec = _CACHE_REC.size + self.tile_size
+        # a torn last record (interrupted run) is dropped
+        for off in range(0, len(data) - rec + 1, rec):
+            (cp,) = _CACHE_REC.unpack_from(data, off)
+            self.tiles[chr(cp)] = data[off + _CACHE_REC.size:off + rec]
+
+    def add(self, tiles):
+        if not tiles:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'ab') as f:
+            for ch, tile in tiles:
+                f.write(_CACHE_REC.pack(ord(ch)) + tile)
+                self.tiles[ch] = tile
+
+
+def render_missing(font_path: str, font_size: int, cell: int, chars: str, jobs: int):
+    """Rasterize chars, in parallel when there are enough of them."""
+    if len(chars) < POOL_MIN_GLYPHS or jobs == 1:
+        font = ImageFont.truetype(font_path, font_size)
+        return [(ch, rasterize(font, ch, cell)) for ch in chars]
+    jobs = jobs or os.cpu_count() or 1
+    step = max(1, -(-len(chars) // (jobs * 4)))
+    chunks = [chars[i:i + step] for i in range(0, len(chars), step)]
+    out = []
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(font_path, font_size)) as pool:
+        for part in pool.map(_rasterize_chunk, chunks, [cell] * len(chunks)):
+            out.extend(part)
+    return out
+
+
+def renders(tile: bytes, notdef: bytes) -> bool:
+    """False for tofu: nothing drawn, or the .notdef box."""
+    return tile != notdef and tile.count(0) < len(tile)
+
+
+def write_bin(path: str, cell: int, tiles):
+    with open(path, 'wb') as f:
+        f.write(BIN_HEADER.pack(BIN_MAGIC, cell, len(tiles), BIN_HEADER.size))
+        for tile in tiles:
+            f.write(tile)
+
+
+def bake(font_path: str, font_size: int, cell: int, cols: int, out_png: str, out_json: str, glyph_set: str,
+         cache_dir: str = DEFAULT_CACHE, jobs: int = 0, out_bin: str = None):
+    fhash = font_hash(font_path)
+    cache = GlyphCache(cache_dir, fhash, font_size, cell)
+    glyph_set = glyphs.dedup(glyph_set)
+    missing = ''.join(ch for ch in glyph_set + NOTDEF_PROBE if ch not in cache.tiles)
+    cache.add(render_missing(font_path, font_size, cell, missing, jobs))
+
+    notdef = cache.tiles[NOTDEF_PROBE]
+    keep = ''.join(ch for ch in glyph_set if renders(cache.tiles[ch], notdef))
+    dropped = glyphs.keep(glyph_set, set(glyph_set) - set(keep))
+    tiles = [cache.tiles[ch] for ch in keep]
+
+    rows = (len(keep) + cols - 1) // cols
     w = cols * cell
     h = rows * cell
     img = Image.new('RGBA', (w, h), (0,0,0,0))
-    draw = ImageDraw.Draw(img)
+    white = Image.new('RGBA', (cell, cell), (255,255,255,255))
 
     mapping = {}
     i = 0
-    for ch in glyphs:
+    for ch, tile in zip(keep, tiles):
         cx = (i % cols) * cell
         cy = (i // cols) * cell
-        # center glyph in cell
-        bbox = font.getbbox(ch)
-        gw = bbox[2] - bbox[0]
-        gh = bbox[3] - bbox[1]
-        gx = cx + (cell - gw) // 2 - bbox[0]
-        gy = cy + (cell - gh) // 2 - bbox[1]
-        draw.text((gx, gy), ch, font=font, fill=(255,255,255,255))
+        img.paste(white, (cx, cy), Image.frombytes('L', (cell, cell), tile))
         mapping[ch] = i
         i += 1
 
-    os.makedirs(os.path.dirname(out_png), exist_ok=True)
+    os.makedirs(os.path.dirname(out_png) or '.', exist_ok=True)
     img.save(out_png)
+    if out_bin is None:
+        out_bin = os.path.splitext(out_png)[0] + '.bin'
+    write_bin(out_bin, cell, tiles)
     meta = {
         'cell': cell,
         'cols': cols,
         'rows': rows,
         'count': i,
+        'size': font_size,
+        'font_sha256': fhash,
+        'bin': os.path.basename(out_bin),
         'mapping': mapping,
+        'dropped': dropped,
     }
     with open(out_json, 'w') as f:
         json.dump(meta, f, ensure_ascii=False, indent=2)
+    return len(missing), dropped
+
+
+def scaled_path(path: str, scale: int) -> str:
+    if scale == 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f'{root}@{scale}x{ext}'
 
 
 if __name__ == '__main__':
@@ -73,7 +212,15 @@ if __name__ == '__main__':
     p.add_argument('--out', default='assets/glyph_atlas.png')
     p.add_argument('--map', default='assets/glyph_map.json')
     p.add_argument('--glyphs', default=None)
+    p.add_argument('--scales', default='1', help='comma-separated integer scales, e.g. 1,2')
+    p.add_argument('--cache', default=DEFAULT_CACHE)
+    p.add_argument('--jobs', type=int, default=0, help='rasterizer processes (0 = one per CPU)')
     args = p.parse_args()
 
-    glyphs = args.glyphs if args.glyphs is not None else DEFAULT_GLYPHS
-    bake(args.font, args.size, args.cell, args.cols, args.out, args.map, glyphs)
+    glyph_set = args.glyphs if args.glyphs is not None else DEFAULT_GLYPHS
+    for scale in (int(s) for s in args.scales.split(',')):
+        rendered, dropped = bake(args.font, args.size * scale, args.cell * scale, args.cols,
+                                 scaled_path(args.out, scale), scaled_path(args.map, scale), glyph_set,
+                                 cache_dir=args.cache, jobs=args.jobs)
+        print(f'{scaled_path(args.out, scale)}: {len(set(glyph_set)) - len(dropped)} glyphs, '
+              f'{rendered} rendered, {len(dropped)} dropped {dropped}')
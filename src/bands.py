@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Column-band worker engine for livemtrx.
+
+For very wide canvases (wall displays made of several terminals) the Python
+stream loop runs on one core. This engine splits the columns into bands
+and gives each band to its own worker process, which owns that band's
+ColumnStream objects, advances them with the same rules as draw()'s loop,
+diffs the result against its own cell cache and writes the changed cells
+into a shared-memory block. The main process only sends one small step
+message per band, then merges the returned cells into the SpanWriter.
+
+step() returns the same (ys, xs, glyphs, tiers, pals) columns as SoAEngine,
+so draw() treats both engines alike. If a worker dies or raises, the engine
+shuts down and raises lm.EngineFailure; draw() then continues with its
+in-process streams.
+
+Whether this is faster depends on spare cores: the pipe round trip and the
+merge cost the main process time of their own. On a single-CPU box,
+2000x60 at density 0.75 runs at 37 fps with 2 bands against 54 fps in
+process. Measure before enabling:
+
+    LIVEMTRX_BANDS=4 python3 src/bench.py --engine bands --sizes 2000x60
+
+Enable with LIVEMTRX_ENGINE=bands; LIVEMTRX_BANDS sets the worker count
+(default: one per CPU).
+"""
+import multiprocessing as mp
+import os
+import random
+import traceback
+import weakref
+from array import array
+from multiprocessing import shared_memory
+
+import livemtrx as lm
+
+TIER_HALO = lm.TIER_HALO
+
+# Worker count (0 = one per CPU)
+BANDS = int(os.environ.get('LIVEMTRX_BANDS', 0)) or os.cpu_count() or 1
+
+# Narrowest band worth a process
+MIN_BAND_COLS = 16
+
+# Fields per cell record in the shared block: y, x, glyph, tier, pal
+_REC = 5
+
+# Packed cell key layout for the band's diff cache (same as soa_engine)
+_TIER_SHIFT = 16
+_PAL_SHIFT = 19
+
+
+class BandSim:
+    """
+    ColumnStream simulation for columns x0..x1-1, run inside a worker.
+    Mirrors step_streams() in livemtrx.draw(), but emits packed
+    (y, x, glyph, tier, pal) records instead of curses attrs.
+    """
+    def __init__(self, x0: int, x1: int, h: int, density: float, seed: int):
+        self.x0 = x0
+        self.bw = x1 - x0
+        self.h = h
+        lm.reseed(seed)
+        self.streams = [lm.spawn_stream(x, density) for x in range(x0, x1)]
+        # last emitted key per cell, -1 = unknown (always re-emit)
+        self.cache = array('q', [-1]) * (h * self.bw)
+
+    def resize(self, h: int, x1: int, density: float):
+        """Keep surviving columns and their cached cells; spawn only new ones."""
+        x0, old_bw, old_h = self.x0, self.bw, self.h
+        bw = x1 - x0
+        lm.stream_pool.release(self.streams[bw:])
+        del self.streams[bw:]
+        self.streams.extend(lm.spawn_stream(x, density) for x in range(x0 + len(self.streams), x1))
+
+        cache = array('q', [-1]) * (h * bw)
+        keep = min(bw, old_bw)
+        old = self.cache
+        for y in range(min(h, old_h)):
+            cache[y * bw:y * bw + keep] = old[y * old_bw:y * old_bw + keep]
+        self.cache = cache
+        self.bw = bw
+        self.h = h
+
+    def invalidate(self, cells):
+        x0, bw, h, cache = self.x0, self.bw, self.h, self.cache
+        for y, x in cells:
+            if 0 <= y < h and 0 <= x - x0 < bw:
+                cache[y * bw + x - x0] = -1
+
+    def invalidate_all(self):
+        self.cache = array('q', [-1]) * (self.h * self.bw)
+
+    def step(self, dt: float, speed_factor: float, density: float, n_pal: int) -> array:
+        h, x0, bw = self.h, self.x0, self.bw
+        cache = self.cache
+        next_glyph = lm.glyph_source.next
+        smax = lm.STREAM_LEN_MAX
+        out = array('I')
+        emit = out.extend
+
+        def put(y, x, g, tier, pal):
+            # lead/halo colours change in the main process every frame, so
+            # those always pass through
+            key = g | (tier << _TIER_SHIFT) | (pal << _PAL_SHIFT)
+            idx = y * bw + x - x0
+            if cache[idx] == key and tier != 0 and tier != TIER_HALO:
+                return
+            cache[idx] = key
+            emit((y, x, g, tier, pal))
+
+        respawn = lm.respawn_stream
+
+        def trail(s, head, limit, body_k):
+            ring = s.chars
+            buf, off = ring.buf, ring.head
+            lut = s.lut
+            for i in range(min(limit, s.length)):
+                y = head - i
+                if y < 0 or y >= h:
+                    continue
+                g = buf[(off + i) % smax]
+                if i == 0:
+                    # Head phosphor halo (CRT bloom illusion)
+                    if y + 1 < h:
+                        put(y + 1, s.x, g, TIER_HALO, 0)
+                    put(y, s.x, g, 0, 0)
+                else:
+                    put(y, s.x, g, lut[i] if i < len(lut) else 2, body_k)
+
+        for s in self.streams:
+            if not s.active:
+                # occasionally (re)activate with a fresh spawn
+                if random.random() < density * 0.02:
+                    respawn(s, density)
+                    s.active = True
+                continue
+
+            s.y += (s.speed * speed_factor) * dt
+            head = int(s.y)
+
+            if head != s.last_head_y:
+                steps = head - s.last_head_y
+                if steps > 0:
+                    steps = min(steps, s.length)
+                    for _ in range(steps):
+                        s.chars.push(next_glyph())
+                s.last_head_y = head
+
+                if lm.PARTIAL_REDRAW and steps > 0:
+                    body_k = random.randrange(n_pal) if n_pal else 0
+                    trail(s, head, 4, body_k)
+                    continue
+
+            # reset if fully offscreen
+            if head - s.length > h + 2:
+                if random.random() < density:
+                    respawn(s, density)
+                    s.active = True
+                else:
+                    s.active = False
+                continue
+
+            # occasional small mutations so tails aren't perfectly static
+            if random.random() < 0.06 and s.length > 1:
+                idx = random.randrange(0, max(1, int(s.length * 0.5)))
+                s.chars.set(idx, next_glyph())
+            elif random.random() < 0.015:
+                idx = random.randrange(0, s.length)
+                s.chars.set(idx, next_glyph())
+
+            body_k = random.randrange(n_pal) if n_pal else 0
+            trail(s, head, s.length, body_k)
+
+        return out
+
+
+def _band_worker(conn, shm_name: str, x0: int, x1: int, h: int, density: float, seed: int):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    out = shm.buf.cast('I')
+    try:
+        sim = BandSim(x0, x1, h, density, seed)
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+            if msg[0] == 'resize':
+                _, h, x1, density, new_name = msg
+                if new_name is not None:
+                    # band grew past its block: move to the bigger one
+                    out.release()
+                    shm.close()
+                    shm = shared_memory.SharedMemory(name=new_name)
+                    out = shm.buf.cast('I')
+                sim.resize(h, x1, density)
+                conn.send(0)
+                continue
+            args, inval, inval_all = msg
+            if inval_all:
+                sim.invalidate_all()
+            elif inval:
+                sim.invalidate(inval)
+            recs = sim.step(*args)
+            out[:len(recs)] = recs
+            conn.send(len(recs) // _REC)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception:
+        # report to the parent, which falls back to the in-process loop
+        try:
+            conn.send(traceback.format_exc())
+        except OSError:
+            pass
+    finally:
+        out.release()
+        shm.close()
+        conn.close()
+
+
+def _block_size(cols: int) -> int:
+    # worst case per step: a full redraw of every column plus its halo
+    return cols * (lm.STREAM_LEN_MAX + 1) * _REC * 4
+
+
+def _shutdown(bands):
+    for _x0, _x1, conn, shm, proc in bands:
+        try:
+            conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        proc.join(timeout=1.0)
+        if proc.is_alive():
+            proc.terminate()
+        conn.close()
+        shm.close()
+        shm.unlink()
+    bands.clear()
+
+
+class BandEngine:
+    """
+    Runs one BandSim per column band in worker processes. Each band writes
+    its changed cells into its own shared-memory block; step() fans the step
+    out to every band, then gathers and concatenates the records.
+    """
+    def __init__(self, h: int, w: int, density: float, seed=None, bands: int = BANDS):
+        self.h = h
+        self.w = w
+        n = max(1, min(bands, w // MIN_BAND_COLS))
+        rng = random.Random(seed)
+        edges = [w * i // n for i in range(n + 1)]
+        self.bands = []   # [x0, x1, conn, shm, proc]
+        self._inval = [[] for _ in range(n)]
+        self._inval_all = False
+
+        ctx = mp.get_context()
+        for x0, x1 in zip(edges, edges[1:]):
+            shm = shared_memory.SharedMemory(create=True, size=_block_size(x1 - x0))
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(
+                target=_band_worker,
+                args=(child, shm.name, x0, x1, h, density, rng.getrandbits(32)),
+                daemon=True,
+            )
+            proc.start()
+            child.close()
+            self.bands.append([x0, x1, parent, shm, proc])
+        # stop workers and free the shared blocks even if draw() dies mid-frame
+        self._finalizer = weakref.finalize(self, _shutdown, self.bands)
+        lm.log(f'band engine: {n} workers for {w} columns')
+
+    def resize(self, h: int, w: int, density: float):
+        """
+        Bands past the new width are shut down, the last band takes the
+        width delta, and every worker crops or grows its streams and cache
+        in place.
+        """
+        keep = max(1, sum(1 for b in self.bands if b[0] < w))
+        _shutdown(self.bands[keep:])
+        del self.bands[keep:]
+        del self._inval[keep:]
+
+        grown = []
+        for i, band in enumerate(self.bands):
+            x1 = w if i == keep - 1 else band[1]
+            new_shm = None
+            if x1 > band[1]:
+                new_shm = shared_memory.SharedMemory(create=True, size=_block_size(x1 - band[0]))
+            self._send(band[2], ('resize', h, x1, density, new_shm and new_shm.name))
+            grown.append(new_shm)
+            band[1] = x1
+        for band, new_shm in zip(self.bands, grown):
+            self._recv(band[2])
+            if new_shm is not None:
+                band[3].close()
+                band[3].unlink()
+                band[3] = new_shm
+        self.h = h
+        self.w = w
+
+    def invalidate(self, y: int, x: int):
+        """A cell was overwritten outside the engine (fade/grain)."""
+        if 0 <= y < self.h and 0 <= x < self.w:
+            for i, (x0, x1, *_rest) in enumerate(self.bands):
+                if x0 <= x < x1:
+                    self._inval[i].append((y, x))
+                    break
+
+    def invalidate_all(self):
+        """Palette changed: every cached colour index is stale."""
+        self._inval_all = True
+
+    def step(self, dt: float, speed_factor: float, density: float, n_pal: int):
+        args = (dt, speed_factor, density, n_pal)
+        for i, (_x0, _x1, conn, _shm, _proc) in enumerate(self.bands):
+            self._send(conn, (args, self._inval[i], self._inval_all))
+            self._inval[i] = []
+        self._inval_all = False
+
+        recs = array('I')
+        for _x0, _x1, conn, shm, _proc in self.bands:
+            n = self._recv(conn)
+            recs.frombytes(shm.buf[:n * _REC * recs.itemsize])
+        return tuple(recs[f::_REC] for f in range(_REC))
+
+    def close(self):
+        self._finalizer()
+
+    def _fail(self, reason: str):
+        lm.log(f'band engine: {reason}')
+        self.close()
+        raise lm.EngineFailure(reason)
+
+    def _send(self, conn, msg):
+        try:
+            conn.send(msg)
+        except OSError as e:
+            self._fail(f'worker gone ({e!r})')
+
+    def _recv(self, conn):
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError) as e:
+            self._fail(f'worker gone ({e!r})')
+        if isinstance(msg, str):
+            self._fail(f'worker raised:\n{msg}')
+        return msg
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Headless benchmark for livemtrx.
+
+Runs the real draw() loop against an in-memory screen with a fixed seed and a
+fixed dt per frame (no wall-clock sleeping), for a grid of terminal sizes and
+densities, and reports frames/sec, cells and output calls per frame and peak
+Python memory.
+
+Usage:
+    python src/bench.py
+    python src/bench.py --sizes 80x24,400x120 --densities 0.25,0.75 --frames 600 --out bench.json
+    python src/bench.py --engine numpy
+    LIVEMTRX_BANDS=4 python src/bench.py --engine bands --sizes 2000x60,4000x60
+
+With --storm every run is hit by bursts of resizes (a new size on each of
+several consecutive frames, as tiling window managers send them) and the
+worst single frame time is reported alongside the usual numbers:
+
+    python src/bench.py --storm --sizes 200x60 --frames 900
+
+Results are written as JSON so runs can be compared between commits.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+import livemtrx as lm
+
+
+class FakeClock:
+    """Monotonic clock that advances by a fixed dt on every sleep()."""
+    def __init__(self, dt: float):
+        self.t = 1000.0
+        self.dt = dt
+
+    def now(self) -> float:
+        return self.t
+
+    def sleep(self, _secs: float):
+        self.t += self.dt
+
+
+class FakeScreen:
+    """In-memory stand-in for the curses window draw() talks to."""
+    def __init__(self, h: int, w: int, frames: int, sizes=None):
+        self.h = h
+        self.w = w
+        self.sizes = sizes     # optional per-frame (h, w) schedule
+        self.max_frames = frames
+        self.frames = 0        # loop iterations (one sim step each at a fixed dt)
+        self.renders = 0       # refresh() calls
+        self.cells = 0
+        self.addch_calls = 0
+        self.addstr_calls = 0
+        self.max_frame_sec = 0.0   # slowest loop iteration (wall clock)
+        self._t = None
+
+    def getmaxyx(self):
+        if self.sizes is not None:
+            return self.sizes[min(self.frames, len(self.sizes) - 1)]
+        return self.h, self.w
+
+    def nodelay(self, flag):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def erase(self):
+        pass
+
+    def getch(self) -> int:
+        t = time.perf_counter()
+        if self._t is not None:
+            self.max_frame_sec = max(self.max_frame_sec, t - self._t)
+        self._t = t
+        if self.frames >= self.max_frames:
+            return ord('q')
+        self.frames += 1
+        return -1
+
+    def addch(self, y, x, ch, attr=0):
+        self.addch_calls += 1
+        self.cells += 1
+
+    def addstr(self, y, x, s, attr=0):
+        self.addstr_calls += 1
+        self.cells += len(s)
+
+    def refresh(self):
+        self.renders += 1
+
+
+def storm_sizes(h: int, w: int, frames: int, seed: int, every: int = 90, burst: int = 12):
+    """
+    Per-frame sizes: every `every` frames a burst of `burst` resizes, one per
+    frame, between the base size and up to 40% smaller/10% larger, which then
+    holds at the burst's last size.
+    """
+    rng = random.Random(seed)
+    sizes = []
+    cur = (h, w)
+    for f in range(frames + 1):
+        if f % every >= every - burst:
+            cur = (max(4, int(h * rng.uniform(0.6, 1.1))), max(8, int(w * rng.uniform(0.6, 1.1))))
+        sizes.append(cur)
+    return sizes
+
+
+def run_once(h: int, w: int, density: float, frames: int, seed: int, dt: float, storm: bool = False):
+    lm.reseed(seed)
+    clock = FakeClock(dt)
+    scr = FakeScreen(h, w, frames, storm_sizes(h, w, frames, seed) if storm else None)
+    t0 = time.perf_counter()
+    lm.draw(scr, clock=clock.now, sleep=clock.sleep, cm=lm.HeadlessColors(), density=density)
+    return scr, time.perf_counter() - t0
+
+
+def peak_memory(h: int, w: int, density: float, frames: int, seed: int, dt: float, storm: bool = False) -> int:
+    # separate pass: tracemalloc slows the loop too much to time it
+    tracemalloc.start()
+    try:
+        run_once(h, w, density, frames, seed, dt, storm)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def git_rev() -> str:
+    try:
+        out = subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def parse_sizes(text: str):
+    sizes = []
+    for part in text.split(','):
+        w, h = part.lower().split('x')
+        sizes.append((int(w), int(h)))
+    return sizes
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument('--sizes', default='80x24,200x60,300x90,400x120', help='comma separated WxH list')
+    p.add_argument('--densities', default='0.25,0.75,1.0')
+    p.add_argument('--frames', type=int, default=300)
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--dt', type=float, default=lm.DT, help='simulated seconds per frame')
+    p.add_argument('--mem-frames', type=int, default=60, help='frames for the peak memory pass (0 = skip)')
+    p.add_argument('--storm', action='store_true', help='hit every run with bursts of resizes')
+    p.add_argument('--engine', default=lm.ENGINE, choices=('python', 'numpy', 'bands'),
+                   help='simulation engine (default: LIVEMTRX_ENGINE)')
+    p.add_argument('--out', default=None, help='write JSON results here')
+    args = p.parse_args(argv)
+    lm.ENGINE = args.engine
+
+    results = []
+    print(f'{"size":>9} {"dens":>5} {"fps":>9} {"cells/f":>9} {"calls/f":>9} {"addch/f":>8} '
+          f'{"max ms":>8} {"peak KiB":>9}')
+    for w, h in parse_sizes(args.sizes):
+        for density in (float(d) for d in args.densities.split(',')):
+            scr, wall = run_once(h, w, density, args.frames, args.seed, args.dt, args.storm)
+            n = max(1, scr.frames)
+            peak = (peak_memory(h, w, density, args.mem_frames, args.seed, args.dt, args.storm)
+                    if args.mem_frames else None)
+            r = {
+                'width': w,
+                'height': h,
+                'density': density,
+                'frames': scr.frames,
+                'seconds': wall,
+                'fps': scr.frames / wall if wall > 0 else 0.0,
+                'cells_per_frame': scr.cells / n,
+                'calls_per_frame': (scr.addch_calls + scr.addstr_calls) / n,
+                'addch_per_frame': scr.addch_calls / n,
+                'addstr_per_frame': scr.addstr_calls / n,
+                'renders': scr.renders,
+                'max_frame_ms': scr.max_frame_sec * 1000.0,
+                'peak_bytes': peak,
+            }
+            results.append(r)
+            peak_txt = f'{peak / 1024:9.0f}' if peak is not None else f'{"-":>9}'
+            print(f'{w:>4}x{h:<4} {density:5.2f} {r["fps"]:9.1f} {r["cells_per_frame"]:9.1f} '
+                  f'{r["calls_per_frame"]:9.1f} {r["addch_per_frame"]:8.1f} {r["max_frame_ms"]:8.2f} {peak_txt}')
+
+    report = {
+        'rev': git_rev(),
+        'python': platform.python_version(),
+        'engine': lm.ENGINE,
+        'seed': args.seed,
+        'dt': args.dt,
+        'frames': args.frames,
+        'storm': args.storm,
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'wrote {args.out}')
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Frame profiler for livemtrx.
+
+draw() marks the end of each phase of a loop iteration (input, tick,
+predict, fade/grain, stream advance, draw, refresh, sleep); time between
+marks is added to that phase. Per-frame phase times and counters (cells
+written, diff-cache puts and hits) go into preallocated ring buffers, so
+recording a frame allocates nothing.
+
+Each time the ring fills, on SIGUSR1 and on exit, the ring is copied and
+handed to a background thread that appends it as JSON lines: one line per
+frame, then a summary line with per-phase log2 histograms (microseconds).
+
+Enabled together with LIVEMTRX_DEBUG; output goes to LIVEMTRX_PROFILE_PATH.
+"""
+import json
+import os
+import queue
+import signal
+import threading
+import time
+from array import array
+
+PHASES = ('input', 'tick', 'predict', 'fade_grain', 'advance', 'draw', 'refresh', 'sleep')
+(INPUT, TICK, PREDICT, FADE_GRAIN, ADVANCE, DRAW, REFRESH, SLEEP) = range(len(PHASES))
+
+PROFILE_PATH = os.environ.get('LIVEMTRX_PROFILE_PATH', '/tmp/livemtrx.prof.jsonl')
+PROFILE_FRAMES = 2048     # ring size (frames per dump)
+HIST_BUCKETS = 24         # log2 buckets of microseconds: [0, 1), [1, 2), [2, 4) ...
+
+
+class FrameProfiler:
+    def __init__(self, path: str = PROFILE_PATH, frames: int = PROFILE_FRAMES):
+        self.path = path
+        self.size = frames
+        self.phase = [array('d', bytes(8 * frames)) for _ in PHASES]
+        self.cells = array('Q', bytes(8 * frames))
+        self.puts = array('Q', bytes(8 * frames))
+        self.hits = array('Q', bytes(8 * frames))
+        self.frame = 0            # frames recorded so far
+        self._dumped = 0          # first frame not yet dumped
+        self._cur = [0.0] * len(PHASES)
+        self._t = time.perf_counter()
+        self._last = (0, 0, 0)    # counter totals at the previous frame
+        self.dump_requested = False
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name='frameprof', daemon=True)
+        self._thread.start()
+        try:
+            signal.signal(signal.SIGUSR1, self._on_signal)
+        except (ValueError, AttributeError):
+            # not the main thread / no SIGUSR1 on this platform
+            pass
+
+    def _on_signal(self, signum, frame):
+        self.dump_requested = True
+
+    def lap(self, phase: int):
+        """Charge the time since the previous mark to phase."""
+        t = time.perf_counter()
+        self._cur[phase] += t - self._t
+        self._t = t
+
+    def end_frame(self, cells: int, puts: int, hits: int):
+        """Record the frame; cells/puts/hits are running totals."""
+        i = self.frame % self.size
+        cur = self._cur
+        for p, ring in enumerate(self.phase):
+            ring[i] = cur[p]
+            cur[p] = 0.0
+        c0, p0, h0 = self._last
+        self.cells[i] = cells - c0
+        self.puts[i] = puts - p0
+        self.hits[i] = hits - h0
+        self._last = (cells, puts, hits)
+        self.frame += 1
+        if self.frame - self._dumped >= self.size or self.dump_requested:
+            self.dump()
+
+    def dump(self):
+        """Copy the frames recorded since the last dump and queue them for writing."""
+        self.dump_requested = False
+        first, last = self._dumped, self.frame
+        if last <= first:
+            return
+        self._dumped = last
+        idx = [f % self.size for f in range(first, last)]
+        snap = {
+            'first': first,
+            'phase': [[ring[i] for i in idx] for ring in self.phase],
+            'cells': [self.cells[i] for i in idx],
+            'puts': [self.puts[i] for i in idx],
+            'hits': [self.hits[i] for i in idx],
+        }
+        self._queue.put(snap)
+
+    def close(self):
+        self.dump()
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+
+    @staticmethod
+    def _histogram(samples):
+        hist = [0] * HIST_BUCKETS
+        for s in samples:
+            us = int(s * 1e6)
+            hist[min(us.bit_length(), HIST_BUCKETS - 1)] += 1
+        return hist
+
+    def _writer(self):
+        while True:
+            snap = self._queue.get()
+            if snap is None:
+                return
+            try:
+                self._write(snap)
+            except OSError:
+                pass
+
+    def _write(self, snap):
+        phase = snap['phase']
+        n = len(snap['cells'])
+        with open(self.path, 'a') as f:
+            for k in range(n):
+                rec = {'frame': snap['first'] + k}
+                for p, name in enumerate(PHASES):
+                    rec[name] = round(phase[p][k] * 1e3, 4)   # ms
+                rec['cells'] = snap['cells'][k]
+                rec['puts'] = snap['puts'][k]
+                rec['hits'] = snap['hits'][k]
+                f.write(json.dumps(rec) + '\n')
+            total = [sum(col[k] for col in phase) for k in range(n)]
+            summary = {
+                'summary': {
+                    'frames': [snap['first'], snap['first'] + n],
+                    'mean_ms': {name: round(sum(phase[p]) / n * 1e3, 4) for p, name in enumerate(PHASES)},
+                    'hist_us_log2': {name: self._histogram(phase[p]) for p, name in enumerate(PHASES)},
+                    'frame_hist_us_log2': self._histogram(total),
+                    'cells': sum(snap['cells']),
+                    'puts': sum(snap['puts']),
+                    'hits': sum(snap['hits']),
+                }
+            }
+            f.write(json.dumps(summary) + '\n')
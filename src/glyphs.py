@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Glyph registry shared by livemtrx.py, main.py and LiveMTRX-sdl/tools/bake_atlas.py.
+
+The baker bakes ALL_GLYPHS and leaves out those the font cannot draw; the
+JSON map it writes then lists exactly the glyphs that render. With
+LIVEMTRX_GLYPH_MAP=<glyph_map.json> the renderer pools (ASCII_POOL,
+UNICODE_GLYPHS, CLASSIC_CHARS) are cut down to that list at import, so the
+renderers only ever pick glyphs the atlas has. ALL_GLYPHS is not restricted:
+rebaking with the variable still set bakes the full registry.
+"""
+import json
+import os
+
+# Slightly more "matrixy" pool (still includes some symbols)
+ASCII_POOL = (
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    "0123456789"
+    "@#$%&*+=-:;.,!?/\\|[]{}()<>"
+)
+
+# Unicode glyph pool - curated to *usually* render in common macOS mono fonts.
+# Glyphs the atlas font lacks are pruned by the baker (see above).
+UNICODE_GLYPHS = (
+    # Katakana (classic matrix vibe)
+    "ｱｲｳｴｵｶｷｸｹｺｻｼｽｾｿﾀﾁﾂﾃﾄﾅﾆﾇﾈﾉ"
+    "ﾊﾋﾌﾍﾎﾏﾐﾑﾒﾓﾔﾕﾖﾗﾘﾙﾚﾛﾜﾝ"
+    # Greek (usually safe)
+    "ΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩ"
+    "αβγδεζηθικλμνξοπρστυφχψω"
+    # Math-ish symbols (often safe)
+    "∑∏√∞≈≠≤≥÷×±∫∂∇∈∩∪⊂⊃⊕⊗"
+    # Box drawing (safe and very terminal-friendly)
+    "│┃━─┌┐└┘├┤┬┴┼╭╮╰╯"
+    # Misc techy symbols
+    "◊◈◇◆○●◎◌◍◐◑◒◓"
+    "■□▢▣▤▥▦▧▨▩"
+)
+
+# main.py's ANSI renderer: plain ASCII, lowercase included
+CLASSIC_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789@#$%^&*()[]{}<>/\\|;:,."\''
+
+# Atlas map whose glyphs the renderer pools are restricted to (unset = no restriction)
+GLYPH_MAP = os.environ.get('LIVEMTRX_GLYPH_MAP')
+
+
+def dedup(glyphs: str) -> str:
+    """glyphs with repeats removed, first occurrence kept."""
+    return ''.join(dict.fromkeys(glyphs))
+
+
+def load_renderable(map_path: str) -> set:
+    """The glyphs a baked atlas map holds (the baker drops ones that do not render)."""
+    with open(map_path, encoding='utf-8') as f:
+        return set(json.load(f)['mapping'])
+
+
+def keep(pool: str, renderable) -> str:
+    return ''.join(ch for ch in pool if ch in renderable)
+
+
+# Everything any renderer may draw: what the baker bakes by default. Built
+# from the unrestricted pools, so it never depends on an atlas.
+ALL_GLYPHS = dedup(ASCII_POOL + UNICODE_GLYPHS + CLASSIC_CHARS)
+
+if GLYPH_MAP:
+    _ok = load_renderable(GLYPH_MAP)
+    ASCII_POOL = keep(ASCII_POOL, _ok)
+    UNICODE_GLYPHS = keep(UNICODE_GLYPHS, _ok)
+    CLASSIC_CHARS = keep(CLASSIC_CHARS, _ok)
+    del _ok
+    if not ASCII_POOL or not CLASSIC_CHARS:
+        raise ValueError(f'{GLYPH_MAP}: the atlas has no ASCII glyphs')
@@ -1,21 +1,32 @@
 #!/usr/bin/env python3
 import curses
+import heapq
+import math
 import random
+import select
+import sys
 import time
+from array import array
+from collections import OrderedDict, deque
 from dataclasses import dataclass
 from typing import List
 import os
 
+import glyphs
+
 # Debug logging
 DEBUG = os.environ.get('LIVEMTRX_DEBUG', '0') in ('1', 'true', 'True')
 LOG_PATH = '/tmp/livemtrx.log'
+_log_file = None   # opened on first use, line buffered
 
 def log(msg: str):
+    global _log_file
     if not DEBUG:
         return
     try:
-        with open(LOG_PATH, 'a') as f:
-            f.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}\n")
+        if _log_file is None:
+            _log_file = open(LOG_PATH, 'a', buffering=1)
+        _log_file.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}\n")
     except Exception:
         pass
 
@@ -24,9 +35,16 @@ log(f'TERM={os.environ.get("TERM")}, COLORTERM={os.environ.get("COLORTERM")}, LA
 
 
 THEME_PERIOD_SEC = 30.0
-TARGET_FPS = 45.0
+TARGET_FPS = float(os.environ.get('LIVEMTRX_FPS', 45.0))          # fixed simulation rate
 DT = 1.0 / TARGET_FPS
+RENDER_FPS = float(os.environ.get('LIVEMTRX_RENDER_FPS', TARGET_FPS))  # max terminal updates/sec
+RENDER_DT = 1.0 / RENDER_FPS
+MAX_SIM_STEPS = 5      # sim steps run per loop before the backlog is dropped
+RENDER_SLACK = 0.002   # a render may come this early, so clock jitter costs no extra wakeup
 DEFAULT_DENSITY = 0.75
+DENSITY_MIN = 0.05
+DENSITY_MAX = 1.0
+DENSITY_STEP = 0.05                   # per +/- key press
 
 # Speed modulation
 SPEED_MOOD_PERIOD_SEC = 10.0          # every 10s pick a new speed "mood"
@@ -52,6 +70,7 @@ SCANLINE_DIM_AMOUNT = 1         # 1 = DIM, 2 = DIM+slightly darker color (256 on
 ENABLE_ROLLING_SCANLINE = True
 ROLL_PERIOD_SEC = 10.0           # slower roll = more CRT
 ROLL_WIDTH = 1
+ROLL_FX_BUDGET = int(os.environ.get('LIVEMTRX_FX_BUDGET', 0))  # roll-bar repaints per frame, 0 = terminal width
 ROLL_MODE = "dim"               # "dim" or "bright"
 
 # Partial redraw / caching
@@ -59,37 +78,101 @@ PARTIAL_REDRAW = True
 CLEAR_TAIL_CELL = False     # True = crisper but more draws
 TAIL_CLEAR_CHAR = ' '
 
+# Longest stretch of clean same-attr cells a span may bridge between dirty ones
+SPAN_BRIDGE_GAP = 2
+
+# A new terminal size is applied once it has held this long (resize bursts
+# from tiling window managers collapse into one resize)
+RESIZE_SETTLE_SEC = 0.12
+
+# How often output counters are written to the debug log
+STATS_LOG_SEC = 5.0
+
 # Predictive tick for FX and input (controls max wakeup rate)
 FX_TICK = 1.0 / 30.0  # 30Hz for scanline/input responsiveness
 
-# Slightly more "matrixy" pool (still includes some symbols)
-ASCII_POOL = (
-    "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    "0123456789"
-    "@#$%&*+=-:;.,!?/\\|[]{}()<>"
-)
-
-# Unicode glyph pool - curated to *usually* render in common macOS mono fonts.
-# If you see tofu boxes, remove the ranges you don't like.
-UNICODE_GLYPHS = (
-    # Katakana (classic matrix vibe)
-    "ｱｲｳｴｵｶｷｸｹｺｻｼｽｾｿﾀﾁﾂﾃﾄﾅﾆﾇﾈﾉ"
-    "ﾊﾋﾌﾍﾎﾏﾐﾑﾒﾓﾔﾕﾖﾗﾘﾙﾚﾛﾜﾝ"
-    # Greek (usually safe)
-    "ΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩ"
-    "αβγδεζηθικλμνξοπρστυφχψω"
-    # Math-ish symbols (often safe)
-    "∑∏√∞≈≠≤≥÷×±∫∂∇∈∩∪⊂⊃⊕⊗"
-    # Box drawing (safe and very terminal-friendly)
-    "│┃━─┌┐└┘├┤┬┴┼╭╮╰╯"
-    # Misc techy symbols
-    "◊◈◇◆○●◎◌◍◐◑◒◓"
-    "■□▢▣▤▥▦▧▨▩"
-)
+# Low-power pacing: keep process CPU under this share of one core (e.g. 0.02
+# for 2%) by stepping down render rate, sim rate, active columns and FX; 0 = off
+CPU_BUDGET = float(os.environ.get('LIVEMTRX_CPU_BUDGET', 0))
+POWER_WINDOW_SEC = 2.0        # CPU usage is measured over windows this long
+POWER_RECOVER = 0.6           # step back up once usage stays under this share of the budget
+POWER_RECOVER_WINDOWS = 3     # ... for this many windows in a row
+
+# Opt-in (LIVEMTRX_PREDICT=1): while FX are off, sleep until the next head
+# crosses a row and run the skipped sim steps in one batch on wake. Lossy:
+# body colour re-rolls, tail mutations and reactivations in the skipped steps
+# are only shown in their final state, so the screen updates less often.
+# Input still wakes the loop at once (select() on stdin)
+PREDICTIVE_SLEEP = os.environ.get('LIVEMTRX_PREDICT', '0') in ('1', 'true', 'True')
+
+# Glyph pools live in glyphs.py (shared with main.py and the atlas baker)
+ASCII_POOL = glyphs.ASCII_POOL
+UNICODE_GLYPHS = glyphs.UNICODE_GLYPHS
 
 # What percent of chars should come from UNICODE_GLYPHS
 GLYPH_MIX = 0.28  # 0.0 = pure ASCII, 1.0 = pure unicode
 
+# Pooled glyph table: index < len(ASCII_POOL) is ASCII, the rest is unicode
+GLYPHS = ASCII_POOL + UNICODE_GLYPHS
+
+# Stream trail length range
+STREAM_LEN_MIN = 10
+STREAM_LEN_MAX = 42
+
+# Extra tier for the phosphor halo cell under a head (LUT tiers are 0..3)
+TIER_HALO = 4
+
+# CrossingQueue compacts its heap once it holds this many entries per tracked column
+CROSSING_HEAP_SLACK = 2
+
+# Glyph indices pre-drawn per GlyphSource refill
+GLYPH_BLOCK = 4096
+
+# Fixed seed for reproducible runs (LIVEMTRX_SEED=<int>); unset = wall-clock seeded
+SEED = os.environ.get('LIVEMTRX_SEED')
+
+# Record the session's inputs to this file for replay.py (unset = off)
+RECORD_PATH = os.environ.get('LIVEMTRX_RECORD')
+
+# Runtime control channel: a FIFO read once per loop, one command per line,
+# e.g. "density 0.42" or "density -0.125" (unset = disabled)
+CONTROL_PATH = os.environ.get('LIVEMTRX_CONTROL')
+
+# Simulation engine: "python" (ColumnStream objects), "numpy" (soa_engine)
+# or "bands" (column bands in worker processes, see bands.py)
+ENGINE = os.environ.get('LIVEMTRX_ENGINE', 'python').lower()
+
+class GlyphRing:
+    """
+    Fixed-capacity circular glyph trail. Slots hold indices into GLYPHS and
+    trail index 0 is the glyph at the head: push() prepends in O(1) by moving
+    the head offset instead of shifting the whole trail.
+    """
+    __slots__ = ('buf', 'head')
+
+    def __init__(self, glyphs=()):
+        self.buf = array('H', bytes(2 * STREAM_LEN_MAX))
+        self.head = 0
+        for i, g in enumerate(glyphs):
+            self.buf[i] = g
+
+    def __getitem__(self, i: int) -> str:
+        return GLYPHS[self.buf[(self.head + i) % STREAM_LEN_MAX]]
+
+    def push(self, g: int):
+        self.head = (self.head - 1) % STREAM_LEN_MAX
+        self.buf[self.head] = g
+
+    def set(self, i: int, g: int):
+        self.buf[(self.head + i) % STREAM_LEN_MAX] = g
+
+    def refill(self, n: int, next_glyph):
+        """Reuse the ring for a new trail of n glyphs from next_glyph."""
+        buf = self.buf
+        self.head = 0
+        for i in range(n):
+            buf[i] = next_glyph()
+
 @dataclass
 class ColumnStream:
     x: int
@@ -97,21 +180,54 @@ class ColumnStream:
     speed: float
     length: int
     active: bool
-    chars: List[str]
+    chars: GlyphRing
     last_head_y: int
-    lut: List[int]
+    lut: bytes      # shared INTENSITY_LUTS entry, never mutated
+
+@dataclass
+class PowerLevel:
+    render_hz: float    # max terminal updates/sec
+    sim_div: int        # sim step = DT * sim_div
+    columns: float      # share of the density kept active
+    fx: bool            # fade/grain seasoning and the rolling scanline sweep
+
+# Quality levels for low-power pacing, best first
+POWER_LEVELS = [
+    PowerLevel(RENDER_FPS, 1, 1.0, True),
+    PowerLevel(30.0, 1, 1.0, True),
+    PowerLevel(20.0, 2, 0.8, True),
+    PowerLevel(12.0, 3, 0.6, False),
+    PowerLevel(8.0, 4, 0.45, False),
+    PowerLevel(5.0, 6, 0.3, False),
+]
 
 class ColorManager:
     """
     macOS curses can behave weird with use_default_colors() and bg = -1.
     So we keep it simple: black background, and only use supported fg colors.
     If 256-colors exist, we still only init a small set of pairs to avoid churn.
+
+    Pairs are kept in least-recently-used order. reserve() initialises every
+    pair a palette needs up front; once all COLOR_PAIRS are taken, the least
+    recently used pair is re-initialised for the new colour. Evicted pair
+    ids are queued for take_evicted(), so callers holding attrs built from
+    them (AttrTable, cells on screen) can fix them up.
     """
-    def __init__(self):
-        curses.start_color()
-        self.has_256 = (curses.COLORS >= 256)
-        self._pair = {}   # fg -> pair_id
+    def __init__(self, colors: int = None, pairs: int = None):
+        # colors/pairs given = no live terminal (headless runs), skip start_color()
+        if colors is None:
+            curses.start_color()
+            colors, pairs = curses.COLORS, curses.COLOR_PAIRS
+        self.has_256 = (colors >= 256)
+        self.max_pairs = pairs
+        self._pair = OrderedDict()   # fg -> pair_id, least recently used first
         self._next = 1
+        self._evicted = []           # (fg, pair_id) evicted since take_evicted()
+
+        # counters (cumulative since start)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
         self.bg = curses.COLOR_BLACK
 
@@ -137,23 +253,464 @@ class ColorManager:
             if fg not in self.safe_basic:
                 fg = curses.COLOR_GREEN
 
-        if fg in self._pair:
-            return self._pair[fg]
+        pid = self._pair.get(fg)
+        if pid is not None:
+            self._pair.move_to_end(fg)
+            self.hits += 1
+            return pid
+
+        self.misses += 1
+        if self._next < self.max_pairs:
+            pid = self._next
+            self._next += 1
+        elif self._pair:
+            # out of pairs: reuse the least recently used one
+            old_fg, pid = self._pair.popitem(last=False)
+            self._evicted.append((old_fg, pid))
+            self.evictions += 1
+        else:
+            # no pairs at all (COLOR_PAIRS <= 1): default colours
+            return 0
 
-        pid = self._next
-        # If we somehow exceed pairs, fall back
-        if pid >= curses.COLOR_PAIRS:
-            return self._pair.get(curses.COLOR_GREEN, 1)
+        self._init_pair(pid, fg)
+        self._pair[fg] = pid
+        return pid
+
+    def reserve(self, fgs):
+        """Initialise pairs for every fg up front and mark them most recently used."""
+        for fg in fgs:
+            self.pair(fg)
+
+    def take_evicted(self) -> List[tuple]:
+        """(fg, pair_id) for every pair re-initialised since the last call."""
+        out = self._evicted
+        self._evicted = []
+        return out
+
+    def pair_of(self, attr: int) -> int:
+        """Pair id packed in a curses attr."""
+        return curses.pair_number(attr)
 
+    def _init_pair(self, pid: int, fg: int):
         try:
             curses.init_pair(pid, fg, self.bg)
         except Exception:
             # Hard fallback
             curses.init_pair(pid, curses.COLOR_GREEN, self.bg)
 
-        self._pair[fg] = pid
-        self._next += 1
-        return pid
+    def pair_attr(self, pid: int) -> int:
+        return curses.color_pair(pid)
+
+class HeadlessColors(ColorManager):
+    """ColorManager without a terminal: pairs are numbered, never initialised."""
+    def __init__(self, colors: int = 256, pairs: int = 256):
+        super().__init__(colors, pairs)
+
+    def _init_pair(self, pid: int, fg: int):
+        pass
+
+    def pair_attr(self, pid: int) -> int:
+        return pid << 8   # same packing as curses COLOR_PAIR()
+
+    def pair_of(self, attr: int) -> int:
+        return (attr >> 8) & 0xff
+
+# Lead (head) colours in 256-colour mode: white, or a grey picked per frame
+LEAD_WHITE = 255
+LEAD_GREYS = [250, 251, 252, 253, 254, 255]
+
+class AttrTable:
+    """
+    Final curses attrs for every (row class, tier, colour slot).
+
+    The row class is the scanline parity. The rolling scanline is not baked
+    in: SpanWriter adds roll_fx to the rows under the bar at output time.
+    The colour slot is the theme palette index for body tiers
+    1-3 and the lead colour index for tier 0 and TIER_HALO. The table is
+    rebuilt only when the palette, the lead state or the terminal size
+    change, so per-cell work in draw() is plain indexing.
+
+    color_pair() values are cached per fg across rebuilds; entries whose
+    pair the ColorManager evicted are dropped before the tables are built.
+    """
+    def __init__(self, cm: ColorManager):
+        self.cm = cm
+        self.lead_fgs = [LEAD_WHITE]
+        self.halo = []
+        self.by_class = []     # [row class][tier][slot] -> attr
+        self.scan_class = []   # per row: 1 on scanline rows
+        self.fallback = 0      # colour attr for cells whose pair was evicted
+        self.roll_fx = curses.A_BOLD   # added to cells under the rolling scanline
+        self._color = {}       # fg -> (pair_id, color_pair attr)
+
+    def _cp(self, fg: int) -> int:
+        hit = self._color.get(fg)
+        if hit is None:
+            pid = self.cm.pair(fg)
+            hit = self._color[fg] = (pid, self.cm.pair_attr(pid))
+        return hit[1]
+
+    def rebuild(self, palette: List[int], lead_is_grey: bool, h: int) -> List[int]:
+        """Rebuild the tables; returns the pair ids evicted to make room."""
+        cm = self.cm
+
+        cp = self._cp
+        if cm.has_256:
+            self.lead_fgs = LEAD_GREYS if lead_is_grey else [LEAD_WHITE]
+        else:
+            self.lead_fgs = [curses.COLOR_WHITE]
+        pal = palette or [curses.COLOR_GREEN]
+
+        # initialise (or refresh) every pair this palette needs, then forget
+        # cached attrs for pairs that had to be evicted for them
+        dark = [max(0, fg - 10) if cm.has_256 else fg for fg in pal]
+        cm.reserve(self.lead_fgs + pal + dark)
+        evicted = [pid for _fg, pid in cm.take_evicted()]
+        if evicted:
+            gone = set(evicted)
+            self._color = {fg: v for fg, v in self._color.items() if v[0] not in gone}
+
+        lead_dim = curses.A_DIM if (not cm.has_256) and lead_is_grey else 0
+        tiers = [
+            [cp(fg) | curses.A_BOLD | lead_dim for fg in self.lead_fgs],
+            [cp(fg) | curses.A_BOLD for fg in pal],
+            [cp(fg) for fg in pal],
+            [cp(fg) | curses.A_DIM for fg in dark],
+        ]
+        self.fallback = cp(pal[0])
+        # head phosphor halo: lead colour, dimmed, no scanline FX
+        self.halo = [cp(fg) | curses.A_DIM for fg in self.lead_fgs]
+
+        self.by_class = []
+        for rc in range(2):
+            # scanline applies only as DIM (never recolor)
+            fx = curses.A_DIM if rc else 0
+            rows = [[a | fx for a in tier] for tier in tiers]
+            rows.append(self.halo)
+            self.by_class.append(rows)
+
+        self.scan_class = [1 if ENABLE_SCANLINES and (y & 1) == 0 else 0 for y in range(h)]
+        return evicted
+
+    def rows(self):
+        """Per-row [tier][slot] tables (scanline baked in)."""
+        by_class = self.by_class
+        return [by_class[c] for c in self.scan_class]
+
+class SpanWriter:
+    """
+    Batched curses output stage.
+
+    put() keeps the screen_ch/screen_attr diff cache and only marks cells
+    dirty; flush() walks the dirty cells once per frame, row by row, and
+    emits each run of adjacent same-attr cells with a single addstr()
+    instead of one addch() per cell.
+
+    The rolling scanline is a post-FX stage on top of the cache: the cache
+    holds base attrs and flush() adds roll_fx to cells on the roll rows.
+    When the bar moves, set_roll() queues the lit cells of the rows it left
+    and entered, and each flush() repaints at most fx_budget of them, so the
+    bar sweeps static parts of the screen too at a cost bounded by the width.
+    """
+    def __init__(self, h: int, w: int):
+        self.h = h
+        self.w = w
+        self.screen_ch = [[" "] * w for _ in range(h)]
+        self.screen_attr = [[0] * w for _ in range(h)]
+        self._dirty = set()   # y * w + x
+
+        self.roll_rows = ()       # rows under the rolling scanline
+        self.roll_fx = 0
+        self._fx_queue = deque()  # y * w + x, cells the bar entered or left
+        self.fx_budget = ROLL_FX_BUDGET or w
+
+        # counters (cumulative since start)
+        self.cells = 0        # dirty cells flushed
+        self.sent = 0         # cells sent to curses (dirty plus bridged gaps)
+        self.calls = 0        # addstr calls made
+        self.fx_cells = 0     # cells repainted for the rolling scanline
+        self.puts = 0         # put() calls (counted by put_counted only)
+        self.hits = 0         # puts the diff cache absorbed
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._dirty or self._fx_queue)
+
+    def set_roll(self, top: int, fx: int):
+        """Move the rolling scanline to rows top..top+ROLL_WIDTH-1 (top < 0 = off)."""
+        rows = tuple(y for y in range(top, top + ROLL_WIDTH) if 0 <= y < self.h) if top >= 0 else ()
+        if rows == self.roll_rows and fx == self.roll_fx:
+            return
+        w = self.w
+        queue = self._fx_queue
+        for y in set(rows).symmetric_difference(self.roll_rows):
+            base = y * w
+            # blank cells look the same either way
+            queue.extend(base + x for x, a in enumerate(self.screen_attr[y]) if a)
+        self.roll_rows = rows
+        self.roll_fx = fx
+
+    def resize(self, h: int, w: int):
+        """
+        Resize the diff cache in place. curses keeps the overlapping part of
+        the screen on resize, so cached cells there stay valid; new cells
+        start blank, and dirty cells outside the new size are dropped.
+        """
+        old_w = self.w
+        for row_ch, row_attr in zip(self.screen_ch, self.screen_attr):
+            if w < old_w:
+                del row_ch[w:]
+                del row_attr[w:]
+            else:
+                row_ch.extend([" "] * (w - old_w))
+                row_attr.extend([0] * (w - old_w))
+        del self.screen_ch[h:]
+        del self.screen_attr[h:]
+        for _ in range(len(self.screen_ch), h):
+            self.screen_ch.append([" "] * w)
+            self.screen_attr.append([0] * w)
+
+        dirty = set()
+        for key in self._dirty:
+            y, x = divmod(key, old_w)
+            if y < h and x < w:
+                dirty.add(y * w + x)
+        self._dirty = dirty
+        self.h = h
+        self.w = w
+        # the next set_roll() re-queues the bar rows for the new size
+        self._fx_queue.clear()
+        self.roll_rows = ()
+        self.fx_budget = ROLL_FX_BUDGET or w
+
+    def recolor(self, pids, color: int, pair_of):
+        """
+        Cells drawn with an evicted pair would now show whatever colour the
+        pair was re-initialised to: give them `color` (keeping BOLD/DIM) and
+        queue them for redraw.
+        """
+        pids = set(pids)
+        w = self.w
+        keep = ~curses.A_COLOR
+        for y, row_attr in enumerate(self.screen_attr):
+            for x, a in enumerate(row_attr):
+                if a and pair_of(a) in pids:
+                    row_attr[x] = (a & keep) | color
+                    self._dirty.add(y * w + x)
+
+    def put(self, y: int, x: int, ch: str, attr: int):
+        if 0 <= y < self.h and 0 <= x < self.w:
+            row_ch = self.screen_ch[y]
+            row_attr = self.screen_attr[y]
+            if row_ch[x] == ch and row_attr[x] == attr:
+                return
+            row_ch[x] = ch
+            row_attr[x] = attr
+            self._dirty.add(y * self.w + x)
+
+    def put_counted(self, y: int, x: int, ch: str, attr: int):
+        """put() that also counts calls and cache hits (profiling only)."""
+        self.puts += 1
+        n = len(self._dirty)
+        self.put(y, x, ch, attr)
+        if len(self._dirty) == n:
+            self.hits += 1
+
+    def flush(self, stdscr):
+        queue = self._fx_queue
+        if queue:
+            n = min(len(queue), self.fx_budget)
+            self._dirty.update(queue.popleft() for _ in range(n))
+            self.fx_cells += n
+        if not self._dirty:
+            return
+        w = self.w
+        keys = sorted(self._dirty)
+        self._dirty.clear()
+        roll_rows = self.roll_rows
+        roll_fx = self.roll_fx
+
+        run = []
+        run_y = run_x = 0
+        run_attr = 0
+        prev = -2
+        for key in keys:
+            y, x = divmod(key, w)
+            row_ch = self.screen_ch[y]
+            row_attr = self.screen_attr[y]
+            attr = row_attr[x]
+            gap = key - prev - 1
+            # extend the run with the next cell on the same row; short gaps of
+            # clean cells are bridged when they already carry the run's attr
+            # (curses does not re-send unchanged cells on refresh)
+            if (run and y == run_y and attr == run_attr and gap <= SPAN_BRIDGE_GAP
+                    and all(a == attr for a in row_attr[x - gap:x])):
+                if gap:
+                    run.extend(row_ch[x - gap:x])
+                run.append(row_ch[x])
+            else:
+                if run:
+                    self._emit(stdscr, run_y, run_x, run, run_attr | run_fx)
+                run = [row_ch[x]]
+                run_y, run_x, run_attr = y, x, attr
+                run_fx = roll_fx if y in roll_rows else 0
+            prev = key
+        self._emit(stdscr, run_y, run_x, run, run_attr | run_fx)
+        self.cells += len(keys)
+
+    def _emit(self, stdscr, y: int, x: int, run: List[str], attr: int):
+        self.calls += 1
+        self.sent += len(run)
+        try:
+            stdscr.addstr(y, x, "".join(run), attr)
+        except curses.error:
+            # writing the bottom-right cell errors after the glyph is placed
+            pass
+
+class ControlChannel:
+    """
+    Non-blocking line reader on a named pipe (created if missing). poll()
+    costs one read() per call whether or not anyone is writing, and returns
+    the complete lines received since the last call.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._buf = b''
+        if not os.path.exists(path):
+            os.mkfifo(path)
+        # O_NONBLOCK: open and read never wait for a writer
+        self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+
+    def poll(self) -> List[str]:
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return []
+        if not data:
+            return []
+        *lines, self._buf = (self._buf + data).split(b'\n')
+        return [ln.decode('utf-8', 'replace').strip() for ln in lines if ln.strip()]
+
+    def close(self):
+        os.close(self.fd)
+
+def apply_density_command(cmd: str, density: float) -> float:
+    """'density 0.4' sets, 'density +0.1' / 'density -0.1' steps; anything else is ignored."""
+    parts = cmd.split()
+    if len(parts) != 2 or parts[0] != 'density':
+        log(f'control: ignored {cmd!r}')
+        return density
+    try:
+        v = float(parts[1])
+    except ValueError:
+        log(f'control: bad value {cmd!r}')
+        return density
+    if parts[1][0] in '+-':
+        v += density
+    v = clamp(v, DENSITY_MIN, DENSITY_MAX)
+    log(f'control: {cmd!r} -> density={v:.3f}')
+    return v
+
+class CrossingQueue:
+    """
+    Min-heap of upcoming stream head row crossings, in "virtual time": sim
+    time integrated over speed_factor. Every stream moves at speed *
+    speed_factor, so entries stay valid while the speed mood eases and only
+    streams that crossed a row or were respawned need a new entry. Stale
+    entries (an older generation for that column) are dropped lazily, and
+    the heap is compacted once it holds CROSSING_HEAP_SLACK times as many
+    entries as there are tracked columns.
+    """
+    def __init__(self):
+        self.v = 0.0
+        self._heap = []
+        self._gen = {}   # x -> generation of its live entry
+
+    def rebuild(self, streams: List[ColumnStream]):
+        self._heap = []
+        self._gen = {}
+        for s in streams:
+            if s.active:
+                self.schedule(s)
+
+    def advance(self, dv: float):
+        self.v += dv
+
+    def schedule(self, s: ColumnStream):
+        gen = self._gen.get(s.x, 0) + 1
+        self._gen[s.x] = gen
+        dv = (math.floor(s.y) + 1.0 - s.y) / s.speed
+        heapq.heappush(self._heap, (self.v + dv, s.x, gen))
+        if len(self._heap) > CROSSING_HEAP_SLACK * len(self._gen) + 64:
+            self._compact()
+
+    def _compact(self):
+        gen = self._gen
+        self._heap = [e for e in self._heap if gen.get(e[1]) == e[2]]
+        heapq.heapify(self._heap)
+
+    def cancel(self, s: ColumnStream):
+        self._gen[s.x] = self._gen.get(s.x, 0) + 1
+
+    def next_dv(self):
+        """Virtual time until the earliest crossing, None when nothing moves."""
+        heap, gen = self._heap, self._gen
+        while heap:
+            v, x, g = heap[0]
+            if gen.get(x) == g:
+                return max(0.0, v - self.v)
+            heapq.heappop(heap)
+        return None
+
+class PowerGovernor:
+    """
+    Keeps process CPU time under a budget (share of one core) by moving
+    through POWER_LEVELS: usage is measured once per POWER_WINDOW_SEC, the
+    level drops one step when over budget and comes back one step after
+    POWER_RECOVER_WINDOWS windows with headroom.
+    """
+    def __init__(self, budget: float, t: float, cpu_clock=time.process_time):
+        self.budget = budget
+        self.cpu_clock = cpu_clock
+        self.index = 0
+        self.usage = 0.0
+        self._t0 = t
+        self._c0 = cpu_clock()
+        self._calm = 0
+
+    @property
+    def level(self) -> PowerLevel:
+        return POWER_LEVELS[self.index]
+
+    def update(self, t: float) -> bool:
+        """Close the window if it is due; True when the level changed."""
+        span = t - self._t0
+        if span < POWER_WINDOW_SEC:
+            return False
+        c = self.cpu_clock()
+        self.usage = (c - self._c0) / span
+        self._t0, self._c0 = t, c
+
+        old = self.index
+        if self.usage > self.budget:
+            self.index = min(self.index + 1, len(POWER_LEVELS) - 1)
+            self._calm = 0
+        elif self.usage < self.budget * POWER_RECOVER:
+            self._calm += 1
+            if self._calm >= POWER_RECOVER_WINDOWS and self.index > 0:
+                self.index -= 1
+                self._calm = 0
+        else:
+            self._calm = 0
+        log(f'power: cpu={self.usage * 100:.2f}% budget={self.budget * 100:.1f}% level={self.index}')
+        return self.index != old
+
+def wait_input(secs: float):
+    """Sleep up to secs, returning early as soon as a key is waiting on stdin."""
+    try:
+        select.select([sys.stdin], [], [], secs)
+    except (OSError, ValueError):
+        time.sleep(secs)
 
 def now() -> float:
     return time.monotonic()
@@ -161,11 +718,89 @@ def now() -> float:
 def clamp(v: float, lo: float, hi: float) -> float:
     return lo if v < lo else hi if v > hi else v
 
+class GlyphSource:
+    """
+    Pre-drawn stream of glyph indices into GLYPHS.
+
+    Each refill draws GLYPH_BLOCK indices at once: a single randbytes() call
+    supplies 16 random bits per glyph, which are mapped through a 65536-slot
+    table weighted to reproduce GLYPH_MIX. next() is then one iterator step.
+    The source has its own seedable RNG, so seeded runs are reproducible.
+    """
+    def __init__(self, seed=None):
+        self._rng = random.Random(seed)
+        self._table = self._build_table()
+        self._it = iter(())
+
+    @staticmethod
+    def _build_table() -> List[int]:
+        n_ascii = len(ASCII_POOL)
+        n_uni = len(UNICODE_GLYPHS)
+        mix = GLYPH_MIX if n_uni else 0.0
+        weights = [(1.0 - mix) / n_ascii] * n_ascii
+        if n_uni:
+            weights += [mix / n_uni] * n_uni
+
+        # largest-remainder split of the 65536 slots
+        exact = [wt * 65536 for wt in weights]
+        slots = [int(e) for e in exact]
+        short = 65536 - sum(slots)
+        for g in sorted(range(len(exact)), key=lambda g: slots[g] - exact[g])[:short]:
+            slots[g] += 1
+
+        table = []
+        for g, n in enumerate(slots):
+            table.extend([g] * n)
+        return table
+
+    def _refill(self):
+        bits = array('H')
+        bits.frombytes(self._rng.randbytes(2 * GLYPH_BLOCK))
+        self._it = iter(list(map(self._table.__getitem__, bits)))
+
+    def rebuild(self):
+        """Rebuild the table after the glyph pools changed."""
+        self._table = self._build_table()
+        self._it = iter(())
+
+    def reseed(self, seed):
+        self._rng.seed(seed)
+        self._it = iter(())   # drop glyphs drawn under the old seed
+
+    def next(self) -> int:
+        try:
+            return next(self._it)
+        except StopIteration:
+            self._refill()
+            return next(self._it)
+
+glyph_source = GlyphSource()
+
+def reseed(seed: int):
+    """Reseed the module RNG and the glyph source from one seed."""
+    random.seed(seed)
+    glyph_source.reseed(random.getrandbits(64))
+
+def restrict_glyphs(renderable):
+    """
+    Draw only glyphs in renderable (e.g. the glyphs of a baked atlas).
+    Glyph indices change, so call this before any stream is spawned.
+    """
+    global ASCII_POOL, UNICODE_GLYPHS, GLYPHS
+    ascii_pool = glyphs.keep(ASCII_POOL, renderable)
+    if not ascii_pool:
+        raise ValueError('no ASCII glyph renders')
+    unicode_glyphs = glyphs.keep(UNICODE_GLYPHS, renderable)
+    dropped = len(GLYPHS) - len(ascii_pool) - len(unicode_glyphs)
+    ASCII_POOL, UNICODE_GLYPHS = ascii_pool, unicode_glyphs
+    GLYPHS = ASCII_POOL + UNICODE_GLYPHS
+    glyph_source.rebuild()
+    if dropped:
+        log(f'glyphs: {dropped} glyphs without a rendering dropped')
+
 # Choose a glyph, mixing ASCII and curated Unicode
 def rand_glyph() -> str:
-    if UNICODE_GLYPHS and random.random() < GLYPH_MIX:
-        return random.choice(UNICODE_GLYPHS)
-    return random.choice(ASCII_POOL)
+    return GLYPHS[glyph_source.next()]
 
 # Darken a color index safely for 256-color terminals
 def darken_color(fg: int, has_256: bool) -> int:
@@ -224,26 +859,8 @@ def make_palette(has_256: bool) -> List[int]:
     random.shuffle(base)
     return base[:10] if len(base) >= 10 else base
 
-# Spawn/reset a stream with prefilled chars
-def spawn_stream(x: int, density: float) -> ColumnStream:
-    length = random.randint(10, 42)
-    active = random.random() < density
-    chars = [rand_glyph() for _ in range(length)]
-    # build intensity LUT for this stream length
-    lut = build_intensity_lut(length)
-    return ColumnStream(
-        x=x,
-        y=random.uniform(-length * 2.0, 0.0),
-        speed=random.uniform(BASE_SPEED_MIN, BASE_SPEED_MAX),
-        length=length,
-        active=active,
-        chars=chars,
-        last_head_y=-10_000,
-        lut=lut,
-    )
-
 # intensity LUT helper
-def build_intensity_lut(length: int) -> List[int]:
+def build_intensity_lut(length: int) -> bytes:
     lut = [0] * length
     for i in range(length):
         if i == 0:
@@ -254,74 +871,182 @@ def build_intensity_lut(length: int) -> List[int]:
             lut[i] = 2
         else:
             lut[i] = 3
-    return lut
+    return bytes(lut)
+
+# Read-only intensity LUT per stream length, shared by every stream
+INTENSITY_LUTS = [build_intensity_lut(n) for n in range(STREAM_LEN_MAX + 1)]
+
+# Reset a stream in place with prefilled chars (reuses its ring, allocates nothing)
+def respawn_stream(s: ColumnStream, density: float) -> ColumnStream:
+    length = random.randint(STREAM_LEN_MIN, STREAM_LEN_MAX)
+    s.active = random.random() < density
+    s.chars.refill(length, glyph_source.next)
+    s.lut = INTENSITY_LUTS[length]
+    s.length = length
+    s.y = random.uniform(-length * 2.0, 0.0)
+    s.speed = random.uniform(BASE_SPEED_MIN, BASE_SPEED_MAX)
+    s.last_head_y = -10_000
+    return s
+
+class StreamPool:
+    """
+    Retired ColumnStream objects (columns cut off by a resize, or the old
+    world on a restart), handed out again before any new one is built.
+    """
+    def __init__(self):
+        self._free: List[ColumnStream] = []
+
+    def acquire(self, x: int, density: float) -> ColumnStream:
+        if self._free:
+            s = self._free.pop()
+            s.x = x
+        else:
+            s = ColumnStream(x=x, y=0.0, speed=0.0, length=0, active=False,
+                             chars=GlyphRing(), last_head_y=-10_000, lut=INTENSITY_LUTS[0])
+        return respawn_stream(s, density)
+
+    def release(self, streams):
+        self._free.extend(streams)
+
+stream_pool = StreamPool()
+
+# Spawn a stream with prefilled chars
+def spawn_stream(x: int, density: float) -> ColumnStream:
+    return stream_pool.acquire(x, density)
 
 def init_streams(width: int, density: float) -> List[ColumnStream]:
     return [spawn_stream(x, density) for x in range(width)]
 
-def draw(stdscr):
-    curses.curs_set(0)
+def resize_streams(streams: List[ColumnStream], w: int, density: float):
+    """Keep the surviving columns; spawn or drop only the width delta."""
+    stream_pool.release(streams[w:])
+    del streams[w:]
+    streams.extend(spawn_stream(x, density) for x in range(len(streams), w))
+
+class EngineFailure(RuntimeError):
+    """An engine lost its workers; draw() carries on with the python streams."""
+
+def engine_fallback(err: EngineFailure, w: int, density: float) -> List[ColumnStream]:
+    log(f'engine failed, falling back to python streams: {err}')
+    return init_streams(w, density)
+
+def make_engine(h: int, w: int, density: float):
+    """Build the engine LIVEMTRX_ENGINE asks for, else None (python streams)."""
+    if ENGINE == 'bands':
+        from bands import BandEngine
+        return BandEngine(h, w, density, seed=random.getrandbits(32))
+    if ENGINE != 'numpy':
+        return None
+    try:
+        from soa_engine import SoAEngine
+    except ImportError as e:
+        log(f'numpy engine unavailable, using python streams: {e}')
+        return None
+    return SoAEngine(h, w, density, seed=random.getrandbits(32))
+
+def close_engine(engine):
+    # band workers hold processes and shared memory
+    close = getattr(engine, 'close', None)
+    if close is not None:
+        close()
+
+def spawn_world(h: int, w: int, density: float, old=None):
+    # the engine owns all column state when enabled
+    close_engine(old)
+    engine = make_engine(h, w, density)
+    if engine is not None:
+        return [], engine
+    return init_streams(w, density), None
+
+def draw(stdscr, clock=now, sleep=None, cm=None, density=DEFAULT_DENSITY, control=None):
+    """
+    Main loop. clock/sleep/cm/control are injectable so the loop can run
+    headless or be recorded (see bench.py, replay.py); curses.wrapper() calls
+    it with the live defaults (sleep=None waits on stdin, so keys wake the
+    loop early; control=None opens LIVEMTRX_CONTROL if set).
+    """
+    if sleep is None:
+        sleep = wait_input
+    try:
+        curses.curs_set(0)
+    except curses.error:
+        pass
     stdscr.nodelay(True)
     stdscr.keypad(True)
 
-    cm = ColorManager()
+    if SEED is not None:
+        reseed(int(SEED))
+    next_glyph = glyph_source.next
+
+    if cm is None:
+        cm = ColorManager()
 
     h, w = stdscr.getmaxyx()
-    density = DEFAULT_DENSITY
-    streams = init_streams(w, density)
+    streams, engine = spawn_world(h, w, density)
+    # crossing schedule for predictive sleep (None = off, nothing is queued)
+    crossings = CrossingQueue() if PREDICTIVE_SLEEP else None
+    if crossings is not None:
+        crossings.rebuild(streams)
 
     theme_palette = make_palette(cm.has_256)
-    next_theme_at = now() + THEME_PERIOD_SEC
+    next_theme_at = clock() + THEME_PERIOD_SEC
 
     # speed mood state
     speed_factor = 1.0
     target_speed_factor = 1.0
-    next_speed_mood_at = now() + SPEED_MOOD_PERIOD_SEC
-    speed_ease_t0 = now()
+    next_speed_mood_at = clock() + SPEED_MOOD_PERIOD_SEC
+    speed_ease_t0 = clock()
     speed_ease_from = 1.0
 
     # header color: flip between white and "grey-ish"
     lead_is_grey = random.random() < 0.5
-    next_lead_flip = now() + random.uniform(6.0, 16.0)
-
-    last = now()
-
-    # screen dirty cache
-    screen_ch = [[" "] * w for _ in range(h)]
-    screen_attr = [[0] * w for _ in range(h)]
-
-    def put(y: int, x: int, ch: str, attr: int):
-        if 0 <= y < h and 0 <= x < w:
-            if screen_ch[y][x] == ch and screen_attr[y][x] == attr:
-                return
-            screen_ch[y][x] = ch
-            screen_attr[y][x] = attr
-            try:
-                stdscr.addch(y, x, ch, attr)
-            except curses.error:
-                pass
-
-    # helper to compute attr for an index in a stream
-    def compute_attr(i: int, s: ColumnStream, base_fg_choice: int, lead_fg_local: int):
-        # use stream LUT for tier
-        tier = s.lut[i] if i < len(s.lut) else 2
-        if tier == 0:
-            base_fg = lead_fg_local
-            attr_local = curses.color_pair(cm.pair(base_fg)) | curses.A_BOLD
-            if (not cm.has_256) and lead_is_grey:
-                attr_local |= curses.A_DIM
-        elif tier == 1:
-            base_fg = base_fg_choice
-            attr_local = curses.color_pair(cm.pair(base_fg)) | curses.A_BOLD
-        elif tier == 2:
-            base_fg = base_fg_choice
-            attr_local = curses.color_pair(cm.pair(base_fg))
-        else:
-            base_fg = base_fg_choice
-            if cm.has_256:
-                base_fg = max(0, base_fg - 10)
-            attr_local = curses.color_pair(cm.pair(base_fg)) | curses.A_DIM
-        return attr_local, base_fg
+    next_lead_flip = clock() + random.uniform(6.0, 16.0)
+
+    last = clock()
+    sim_t = last        # simulation clock, advanced in fixed DT steps
+    acc = DT            # run the first step right away
+
+    # pacing, lowered by the power governor when a CPU budget is set
+    power = PowerGovernor(CPU_BUDGET, last) if CPU_BUDGET > 0 else None
+    step_dt = DT
+    render_dt = RENDER_DT
+    fx_on = True
+    sim_density = density   # density times the level's column share
+
+    # effective sim/render rates, logged every STATS_LOG_SEC
+    rates_t0 = last
+    sim_steps = renders = dropped_steps = wakes = 0
+    next_render_at = last
+
+    if control is None and CONTROL_PATH:
+        control = ControlChannel(CONTROL_PATH)
+
+    # terminal size seen but not applied yet (debounced), and when to apply it
+    resize_to = None
+    resize_at = 0.0
+
+    # screen dirty cache + batched output
+    writer = SpanWriter(h, w)
+    put = writer.put
+    next_stats_at = clock() + STATS_LOG_SEC
+
+    # per-phase frame profile (debug runs only; None keeps the loop unmeasured)
+    prof = None
+    if DEBUG:
+        import frameprof as fp
+        prof = fp.FrameProfiler()
+        put = writer.put_counted
+
+    # final attrs per (row class, tier, colour slot)
+    attrs = AttrTable(cm)
+    attrs.rebuild(theme_palette, lead_is_grey, h)
+
+    def rebuild_attrs():
+        # cells still showing an evicted pair get redrawn in a live colour
+        evicted = attrs.rebuild(theme_palette, lead_is_grey, h)
+        if evicted:
+            writer.recolor(evicted, attrs.fallback, cm.pair_of)
+            log(f'colors: evicted {len(evicted)} pairs')
 
     def pick_speed_mood() -> float:
         r = random.random()
@@ -335,113 +1060,20 @@ def draw(stdscr):
         else:
             return random.uniform(1.70, 2.40)   # turbo gremlin (rare)
 
-    while True:
-        t = now()
-        dt = t - last
-        last = t
-        if dt <= 0:
-            dt = DT
-
-        # input
-        try:
-            k = stdscr.getch()
-        except Exception:
-            k = -1
-
-        if k in (ord('q'), ord('Q')):
-            break
-        elif k in (ord('c'), ord('C')):
-            theme_palette = make_palette(cm.has_256)
-            next_theme_at = t + THEME_PERIOD_SEC
-        elif k in (ord('r'), ord('R')):
-            random.seed(int(time.time() * 1000) ^ random.getrandbits(32))
-            streams = init_streams(w, density)
-        elif k == ord('+'):
-            density = clamp(density + 0.05, 0.05, 1.0)
-            streams = init_streams(w, density)
-        elif k == ord('-'):
-            density = clamp(density - 0.05, 0.05, 1.0)
-            streams = init_streams(w, density)
-
-        # resize
-        nh, nw = stdscr.getmaxyx()
-        if (nh, nw) != (h, w):
-            h, w = nh, nw
-            streams = init_streams(w, density)
-            stdscr.erase()
-
-        # theme tick
-        if t >= next_theme_at:
-            theme_palette = make_palette(cm.has_256)
-            next_theme_at = t + THEME_PERIOD_SEC
-
-        # lead flip tick
-        if t >= next_lead_flip:
-            lead_is_grey = not lead_is_grey
-            next_lead_flip = t + random.uniform(6.0, 16.0)
-
-        # speed mood tick
-        if t >= next_speed_mood_at:
-            next_speed_mood_at = t + SPEED_MOOD_PERIOD_SEC
-            speed_ease_t0 = t
-            speed_ease_from = speed_factor
-            target_speed_factor = pick_speed_mood()
-
-        # ease speed_factor toward target to avoid sudden pops
-        ease_u = (t - speed_ease_t0) / SPEED_EASE_SEC
-        if ease_u >= 1.0:
-            speed_factor = target_speed_factor
-        else:
-            ease_u = max(0.0, ease_u)
-            speed_factor = speed_ease_from + (target_speed_factor - speed_ease_from) * ease_u
-
-        # choose lead fg
-        if cm.has_256:
-            lead_fg = random.choice([250, 251, 252, 253, 254, 255]) if lead_is_grey else 255
-        else:
-            lead_fg = curses.COLOR_WHITE
-
-        # --- Predict next stream event (row crossing) to reduce wasted frames ---
-        next_event_dt = FX_TICK
-        for s in streams:
-            if not s.active:
-                continue
-            v = s.speed * speed_factor
-            if v <= 1e-6:
-                continue
-            next_boundary = int(s.y) + 1
-            dt_to_boundary = (next_boundary - s.y) / v
-            if dt_to_boundary > 0 and dt_to_boundary < next_event_dt:
-                next_event_dt = dt_to_boundary
-
-        # simple "fade" by writing spaces at random spots
-        if random.random() < 0.10:
-            fx = random.randrange(0, w)
-            fy = random.randrange(0, h)
-            put(fy, fx, ' ', 0)
-
-        # very subtle terminal 'grain' seasoning
-        if random.random() < 0.002:
-            gx = random.randrange(0, w)
-            gy = random.randrange(0, h)
-            put(gy, gx, '·', curses.A_DIM)
-
-        # draw streams
+    def step_streams():
+        """Advance the ColumnStream objects by one DT step and queue their cells."""
         for s in streams:
             if not s.active:
                 # occasionally (re)activate with a fresh spawn
-                if random.random() < density * 0.02:
-                    ns = spawn_stream(s.x, density)
-                    s.y = ns.y
-                    s.speed = ns.speed
-                    s.length = ns.length
-                    s.chars = ns.chars
-                    s.last_head_y = ns.last_head_y
+                if random.random() < sim_density * 0.02:
+                    respawn_stream(s, sim_density)
                     s.active = True
+                    if crossings is not None:
+                        crossings.schedule(s)
                 continue
 
             # advance stream head
-            s.y += (s.speed * speed_factor) * dt
+            s.y += (s.speed * speed_factor) * step_dt
             head = int(s.y)
 
             # Shift buffered chars only when head moves — this creates long streaks
@@ -451,35 +1083,28 @@ def draw(stdscr):
                 if steps > 0:
                     steps = min(steps, s.length)
                     for _ in range(steps):
-                        s.chars.insert(0, rand_glyph())
-                        s.chars.pop()
+                        s.chars.push(next_glyph())
                 s.last_head_y = head
+                if crossings is not None:
+                    crossings.schedule(s)
 
                 # Partial redraw: only draw the new head area to reduce draws
                 if PARTIAL_REDRAW and steps > 0:
                     # pick a stable body color for this frame to reduce RNG
-                    frame_body_fg = random.choice(theme_palette) if theme_palette else curses.COLOR_GREEN
-                    for dy in range(0, min(4, s.length)):
-                        y = head - dy
+                    body_k = random.randrange(n_pal) if theme_palette else 0
+                    lut = s.lut
+                    for i in range(0, min(4, s.length)):
+                        y = head - i
                         if 0 <= y < h:
-                            i = dy
                             ch = s.chars[i]
-                            attr_local, base_fg_local = compute_attr(i, s, frame_body_fg, lead_fg)
-
-                            # Head phosphor halo (CRT bloom illusion)
                             if i == 0:
-                                hy = y + 1
-                                if 0 <= hy < h:
-                                    halo_attr = curses.color_pair(cm.pair(base_fg_local)) | curses.A_DIM
-                                    put(hy, s.x, ch, halo_attr)
-
-                            # scanline (apply only as DIM, never recolor)
-                            if ENABLE_SCANLINES and (y & 1) == 0:
-                                attr_local |= curses.A_DIM
-                            if ENABLE_ROLLING_SCANLINE and y == roll_row(t, h):
-                                attr_local |= curses.A_BOLD
-
-                            put(y, s.x, ch, attr_local)
+                                # Head phosphor halo (CRT bloom illusion)
+                                if y + 1 < h:
+                                    put(y + 1, s.x, ch, halo_attrs[lead_k])
+                                put(y, s.x, ch, row_attrs[y][0][lead_k])
+                            else:
+                                tier = lut[i] if i < len(lut) else 2
+                                put(y, s.x, ch, row_attrs[y][tier][body_k])
 
                     # optional tail clear
                     if CLEAR_TAIL_CELL:
@@ -492,66 +1117,291 @@ def draw(stdscr):
 
             # reset if fully offscreen
             if head - s.length > h + 2:
-                if random.random() < density:
-                    ns = spawn_stream(s.x, density)
-                    s.y = ns.y
-                    s.speed = ns.speed
-                    s.length = ns.length
-                    s.chars = ns.chars
-                    s.last_head_y = ns.last_head_y
-                    s.lut = ns.lut
+                if random.random() < sim_density:
+                    respawn_stream(s, sim_density)
                     s.active = True
+                    if crossings is not None:
+                        crossings.schedule(s)
                 else:
                     s.active = False
+                    if crossings is not None:
+                        crossings.cancel(s)
                 continue
 
             # occasional small mutations so tails aren't perfectly static
             if random.random() < 0.06 and s.length > 1:
                 # mutate an index in the lively near-head half
                 idx = random.randrange(0, max(1, int(s.length * 0.5)))
-                s.chars[idx] = rand_glyph()
+                s.chars.set(idx, next_glyph())
             elif random.random() < 0.015:
                 # rare deep-tail mutation
                 idx = random.randrange(0, s.length)
-                s.chars[idx] = rand_glyph()
+                s.chars.set(idx, next_glyph())
 
             # draw using buffered chars and a brightness gradient (full column draw)
-            frame_body_fg = random.choice(theme_palette) if theme_palette else curses.COLOR_GREEN
+            body_k = random.randrange(n_pal) if theme_palette else 0
+            lut = s.lut
             for i in range(s.length):
                 y = head - i
                 if y < 0 or y >= h:
                     continue
                 ch = s.chars[i]
-                attr_local, base_fg_local = compute_attr(i, s, frame_body_fg, lead_fg)
-
-                # Head phosphor halo (CRT bloom illusion)
                 if i == 0:
-                    hy = y + 1
-                    if 0 <= hy < h:
-                        halo_attr = curses.color_pair(cm.pair(base_fg_local)) | curses.A_DIM
-                        put(hy, s.x, ch, halo_attr)
+                    # Head phosphor halo (CRT bloom illusion)
+                    if y + 1 < h:
+                        put(y + 1, s.x, ch, halo_attrs[lead_k])
+                    put(y, s.x, ch, row_attrs[y][0][lead_k])
+                else:
+                    tier = lut[i] if i < len(lut) else 2
+                    put(y, s.x, ch, row_attrs[y][tier][body_k])
 
-                # scanline (apply only as DIM, never recolor)
-                if ENABLE_SCANLINES and (y & 1) == 0:
-                    attr_local |= curses.A_DIM
-                if ENABLE_ROLLING_SCANLINE and y == roll_row(t, h):
-                    attr_local |= curses.A_BOLD
+    while True:
+        t = clock()
+        # clamp long stalls (suspend, debugger) instead of replaying them
+        acc += min(max(t - last, 0.0), MAX_SIM_STEPS * step_dt)
+        last = t
 
-                put(y, s.x, ch, attr_local)
+        if power is not None and power.update(t):
+            lv = power.level
+            step_dt = DT * lv.sim_div
+            render_dt = 1.0 / min(RENDER_FPS, lv.render_hz)
+            fx_on = lv.fx
 
-        stdscr.refresh()
-        # Sleep until next important event (stream boundary or FX tick)
-        sleep_for = max(0.0, min(next_event_dt, 0.05))
-        time.sleep(sleep_for)
+        # input
+        try:
+            k = stdscr.getch()
+        except Exception:
+            k = -1
+
+        if k in (ord('q'), ord('Q')):
+            close_engine(engine)
+            if control is not None:
+                control.close()
+            if prof is not None:
+                prof.close()
+            break
+        elif k in (ord('c'), ord('C')):
+            theme_palette = make_palette(cm.has_256)
+            next_theme_at = sim_t + THEME_PERIOD_SEC
+            rebuild_attrs()
+            if engine is not None:
+                engine.invalidate_all()
+        elif k in (ord('r'), ord('R')):
+            if SEED is None:
+                reseed(int(time.time() * 1000) ^ random.getrandbits(32))
+            else:
+                # seeded runs stay reproducible across reseeds
+                reseed(random.getrandbits(32))
+            stream_pool.release(streams)
+            streams, engine = spawn_world(h, w, density, engine)
+            if crossings is not None:
+                crossings.rebuild(streams)
+        elif k == ord('+'):
+            # density is live: idle columns pick it up through the
+            # reactivation path, active ones retire when they run offscreen
+            density = clamp(density + DENSITY_STEP, DENSITY_MIN, DENSITY_MAX)
+        elif k == ord('-'):
+            density = clamp(density - DENSITY_STEP, DENSITY_MIN, DENSITY_MAX)
+
+        if control is not None:
+            for cmd in control.poll():
+                density = apply_density_command(cmd, density)
+
+        # resize: wait for the size to settle, then adapt streams, engine and
+        # diff cache in place instead of starting over
+        size = stdscr.getmaxyx()
+        if size == (h, w):
+            resize_to = None
+        elif size != resize_to:
+            resize_to = size
+            resize_at = t + RESIZE_SETTLE_SEC
+        elif t >= resize_at:
+            log(f'resize {w}x{h} -> {size[1]}x{size[0]}')
+            h, w = size
+            resize_to = None
+            if engine is not None:
+                try:
+                    engine.resize(h, w, sim_density)
+                except EngineFailure as e:
+                    streams, engine = engine_fallback(e, w, sim_density), None
+            else:
+                resize_streams(streams, w, sim_density)
+            if engine is None and crossings is not None:
+                crossings.rebuild(streams)
+            writer.resize(h, w)
+            rebuild_attrs()
+
+        sim_density = density * power.level.columns if power is not None else density
+        if prof is not None:
+            prof.lap(fp.INPUT)
+
+        # fixed-timestep simulation: run every step that is due (bounded),
+        # rendering below coalesces however many steps ran into one frame
+        steps = 0
+        while acc + 1e-9 >= step_dt and steps < MAX_SIM_STEPS:
+            acc -= step_dt
+            sim_t += step_dt
+            steps += 1
+            # theme tick
+            if sim_t >= next_theme_at:
+                theme_palette = make_palette(cm.has_256)
+                next_theme_at = sim_t + THEME_PERIOD_SEC
+                rebuild_attrs()
+                if engine is not None:
+                    engine.invalidate_all()
+
+            # lead flip tick
+            if sim_t >= next_lead_flip:
+                lead_is_grey = not lead_is_grey
+                next_lead_flip = sim_t + random.uniform(6.0, 16.0)
+                rebuild_attrs()
+
+            # speed mood tick
+            if sim_t >= next_speed_mood_at:
+                next_speed_mood_at = sim_t + SPEED_MOOD_PERIOD_SEC
+                speed_ease_t0 = sim_t
+                speed_ease_from = speed_factor
+                target_speed_factor = pick_speed_mood()
+
+            # ease speed_factor toward target to avoid sudden pops
+            ease_u = (sim_t - speed_ease_t0) / SPEED_EASE_SEC
+            if ease_u >= 1.0:
+                speed_factor = target_speed_factor
+            else:
+                ease_u = max(0.0, ease_u)
+                speed_factor = speed_ease_from + (target_speed_factor - speed_ease_from) * ease_u
+
+            # choose lead colour slot (a grey per frame while the lead is grey)
+            n_leads = len(attrs.lead_fgs)
+            lead_k = random.randrange(n_leads) if n_leads > 1 else 0
+            n_pal = len(theme_palette)
+
+            # this frame's attr tables per row (scanline baked in; the writer
+            # applies the rolling scanline)
+            roll = roll_row(sim_t, h) if ENABLE_ROLLING_SCANLINE and fx_on else -1
+            writer.set_roll(roll, attrs.roll_fx)
+            row_attrs = attrs.rows()
+            halo_attrs = attrs.halo
+            if prof is not None:
+                prof.lap(fp.TICK)
+
+            # simple "fade" by writing spaces at random spots
+            if fx_on and random.random() < 0.10:
+                fx = random.randrange(0, w)
+                fy = random.randrange(0, h)
+                put(fy, fx, ' ', 0)
+                if engine is not None:
+                    engine.invalidate(fy, fx)
+
+            # very subtle terminal 'grain' seasoning
+            if fx_on and random.random() < 0.002:
+                gx = random.randrange(0, w)
+                gy = random.randrange(0, h)
+                put(gy, gx, '·', curses.A_DIM)
+                if engine is not None:
+                    engine.invalidate(gy, gx)
+            if prof is not None:
+                prof.lap(fp.FADE_GRAIN)
+
+            if engine is not None:
+                # vectorized engine: only the changed cells come back
+                try:
+                    ys, xs, gs, tiers, pals = engine.step(step_dt, speed_factor, sim_density, n_pal)
+                except EngineFailure as e:
+                    streams, engine = engine_fallback(e, w, sim_density), None
+                    if crossings is not None:
+                        crossings.rebuild(streams)
+                else:
+                    for y, x, g, tier, p in zip(ys.tolist(), xs.tolist(), gs.tolist(), tiers.tolist(), pals.tolist()):
+                        slot = lead_k if tier == 0 or tier == TIER_HALO else p
+                        put(y, x, GLYPHS[g], row_attrs[y][tier][slot])
+            else:
+                if crossings is not None:
+                    crossings.advance(speed_factor * step_dt)
+                step_streams()
+            if prof is not None:
+                prof.lap(fp.ADVANCE)
+
+        if acc + 1e-9 >= step_dt:
+            # still behind after MAX_SIM_STEPS: skip the backlog instead of spiralling
+            dropped_steps += int((acc + 1e-9) // step_dt)
+            acc %= step_dt
+        sim_steps += steps
+        wakes += 1
+
+        # render only when the screen cache changed, at most RENDER_FPS; hold
+        # output while a resize settles (the cache still has the old size)
+        if writer.pending and t + RENDER_SLACK >= next_render_at and resize_to is None:
+            writer.flush(stdscr)
+            if prof is not None:
+                prof.lap(fp.DRAW)
+            stdscr.refresh()
+            if prof is not None:
+                prof.lap(fp.REFRESH)
+            renders += 1
+            # phase-locked to the render period, so late wakeups do not push
+            # the next render past the next sim step (re-anchored after idle)
+            next_render_at += render_dt
+            if next_render_at <= t:
+                next_render_at = t + render_dt
+
+        if DEBUG and t >= next_stats_at:
+            span = t - rates_t0
+            sim_hz = sim_steps / span
+            render_hz = renders / span
+            log(f'rates: sim={sim_hz:.1f}Hz render={render_hz:.1f}Hz wakes={wakes / span:.1f}Hz '
+                f'dropped={dropped_steps} '
+                f'output: dirty={writer.cells} sent={writer.sent} addstr={writer.calls} '
+                f'pairs: hits={cm.hits} misses={cm.misses} evictions={cm.evictions}')
+            rates_t0, sim_steps, renders, wakes = t, 0, 0, 0
+            next_stats_at = t + STATS_LOG_SEC
+
+        # Sleep until the next sim step (or pending render) is due; FX_TICK
+        # caps the wait so input stays responsive
+        wake = step_dt - acc
+        if PREDICTIVE_SLEEP and not fx_on:
+            # skip ahead to the step where the next head crosses a row; the
+            # catch-up batch must fit in MAX_SIM_STEPS. With FX on, fade and
+            # grain need the FX_TICK wakes, so this only runs once the power
+            # governor (or a level) has turned them off
+            if engine is None:
+                dv = crossings.next_dv()
+            else:
+                next_crossing = getattr(engine, 'next_crossing_dv', None)
+                dv = next_crossing() if next_crossing is not None else 0.0
+            ahead = MAX_SIM_STEPS - 2
+            if dv is not None and speed_factor > 0:
+                ahead = min(ahead, dv / (speed_factor * step_dt))
+            wake += max(0, math.ceil(ahead) - 1) * step_dt
+            cap = wake
+        else:
+            cap = max(FX_TICK, step_dt)
+        if resize_to is not None:
+            # output is held until the size settles; wake to apply it
+            wake = min(wake, resize_at - t)
+        elif writer.pending:
+            wake = min(wake, next_render_at - t)
+        if prof is not None:
+            prof.lap(fp.PREDICT)
+        sleep(clamp(wake, 0.0, cap))
+        if prof is not None:
+            prof.lap(fp.SLEEP)
+            prof.end_frame(writer.cells, writer.puts, writer.hits)
 
 def main():
     try:
-        curses.wrapper(draw)
+        if RECORD_PATH:
+            from replay import record
+            curses.wrapper(record, RECORD_PATH)
+        else:
+            curses.wrapper(draw)
     except Exception as e:
         log(f'Unhandled exception in main: {e}')
         raise
 
 if __name__ == "__main__":
+    # let helper modules (soa_engine, ...) `import livemtrx` without loading a second copy
+    sys.modules.setdefault('livemtrx', sys.modules[__name__])
     try:
         main()
     except KeyboardInterrupt:
@@ -4,13 +4,17 @@ LiveMTRX - terminal Matrix effect for macOS
 """
 import sys
 import os
+import io
 import random
 import time
 import shutil
 import signal
 
+from array import array
 from collections import deque
 
+import glyphs
+
 # ANSI escape helpers
 CSI = "\x1b["
 
@@ -24,15 +28,28 @@ PALETTES = [
     [(0, 255, 255), (0, 200, 255), (0, 150, 255), (32, 32, 64)],
 ]
 
-# Characters to display
-CHARS = list('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789@#$%^&*()[]{}<>/\\|;:,."\'')
+# Lead glyph colours (white / grey)
+LEAD_COLORS = [(255, 255, 255), (200, 200, 200)]
+
+# SGR colour mode: 'truecolor' (38;2;r;g;b) or '256' (38;5;n, shorter frames)
+COLOR_MODE = '256' if '--256' in sys.argv[1:] else os.environ.get('LIVEMTRX_COLORS', 'truecolor')
+
+# Chance per frame that a lit cell picks a new glyph/colour
+# (1.0 = every cell every frame, which defeats the frame diff)
+REROLL_CHANCE = 0.05
+
+# Report bytes per frame before/after diffing on exit
+STATS = '--stats' in sys.argv[1:] or os.environ.get('LIVEMTRX_STATS', '0') in ('1', 'true', 'True')
+
+# Characters to display (see glyphs.py)
+CHARS = list(glyphs.CLASSIC_CHARS)
 
 # Terminal control
 def clear():
     sys.stdout.write(CSI + '2J' + CSI + 'H')
 
 def move(x, y):
-    sys.stdout.write(f"{CSI}{y};{x}H")
+    return f"{CSI}{y};{x}H"
 
 def hide_cursor():
     sys.stdout.write(CSI + '?25l')
@@ -44,14 +61,178 @@ def set_rgb(r, g, b, bright=False):
     # Use 38;2 for truecolor
     return f"{CSI}38;2;{r};{g};{b}m"
 
+# xterm 256-colour cube levels
+CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+
+def rgb_to_256(r, g, b):
+    # nearest of the 6x6x6 cube (16..231) and the grey ramp (232..255)
+    def nearest(v):
+        return min(range(6), key=lambda i: abs(CUBE_LEVELS[i] - v))
+    ri, gi, bi = nearest(r), nearest(g), nearest(b)
+    cube = (CUBE_LEVELS[ri], CUBE_LEVELS[gi], CUBE_LEVELS[bi])
+    step = max(0, min(23, ((r + g + b) // 3 - 8) // 10))
+    grey = 8 + step * 10
+    d_cube = (cube[0] - r) ** 2 + (cube[1] - g) ** 2 + (cube[2] - b) ** 2
+    d_grey = (grey - r) ** 2 + (grey - g) ** 2 + (grey - b) ** 2
+    if d_grey < d_cube:
+        return 232 + step
+    return 16 + 36 * ri + 6 * gi + bi
+
+def set_256(n):
+    return f"{CSI}38;5;{n}m"
+
 def reset():
     sys.stdout.write(CSI + '0m')
 
+class FrameWriter:
+    """
+    Composes each frame of ANSI output in one buffer, diffed against what the
+    terminal already shows.
+
+    Cells are collected during the frame (last write wins). flush() compares
+    them with a compact front buffer (one packed int per cell: code point +
+    SGR id) and emits only cells that changed, plus blanks for cells that were
+    lit last frame and are not any more (vacated tails). Output is row-major,
+    so a cursor move is skipped when a cell sits right after the previous one
+    (and shortened to a cursor-forward on the same row), and the colour SGR is
+    only sent when it changes. The frame goes out with a single write + flush.
+
+    With stats=True the undiffed frame is composed as well, so bytes per frame
+    before/after diffing can be reported (see report()).
+    """
+    def __init__(self, cols, rows, out=None, stats=False):
+        self.cols = cols
+        self.rows = rows
+        self.out = out or sys.stdout
+        self.cells = {}     # (y, x) -> (ch, sgr), last write wins
+        self.cur = None     # where the terminal cursor is, None = unknown
+        self.sgr = None     # SGR currently active on the terminal
+
+        # front buffer: what the terminal shows, 0 = blank
+        self.front = array('Q', bytes(8 * cols * rows))
+        self.lit = set()    # cells drawn last frame
+        self._sgr_ids = {}  # SGR string -> small id for packing
+
+        self.stats = stats
+        self.frames = 0
+        self.bytes_full = 0   # bytes a full redraw would have sent
+        self.bytes_sent = 0
+
+    def put(self, x, y, ch, sgr):
+        self.cells[(y, x)] = (ch, sgr)
+
+    def invalidate(self):
+        """Something else wrote to the terminal: forget cursor, SGR and screen state."""
+        self.cur = None
+        self.sgr = None
+        self.front = array('Q', bytes(8 * self.cols * self.rows))
+        self.lit = set()
+
+    def _compose(self, cells, cur, active):
+        # cells: sorted [((y, x), ch, sgr)]; sgr None = keep the current colour
+        buf = io.StringIO()
+        w = buf.write
+        cols = self.cols
+        for (y, x), ch, sgr in cells:
+            if cur != (x, y):
+                if cur is not None and cur[1] == y and x > cur[0]:
+                    dx = x - cur[0]
+                    w(f"{CSI}{dx}C" if dx > 1 else CSI + "C")
+                else:
+                    w(move(x, y))
+            if sgr is not None and sgr != active:
+                w(sgr)
+                active = sgr
+            w(ch)
+            # the last column leaves a pending wrap: position unknown
+            cur = (x + 1, y) if x < cols else None
+        return buf.getvalue(), cur, active
+
+    def flush(self):
+        cells = self.cells
+        front = self.front
+        cols = self.cols
+        sgr_ids = self._sgr_ids
+
+        changed = []
+        # vacated cells: lit last frame, not drawn this frame
+        for key in self.lit.difference(cells):
+            y, x = key
+            idx = (y - 1) * cols + (x - 1)
+            if front[idx]:
+                front[idx] = 0
+                changed.append((key, ' ', None))
+        for key, (ch, sgr) in cells.items():
+            y, x = key
+            idx = (y - 1) * cols + (x - 1)
+            sid = sgr_ids.get(sgr)
+            if sid is None:
+                sid = sgr_ids[sgr] = len(sgr_ids) + 1
+            code = ord(ch) | (sid << 21)
+            if front[idx] != code:
+                front[idx] = code
+                changed.append((key, ch, sgr))
+        changed.sort()
+
+        if self.stats:
+            full = sorted((key, ch, sgr) for key, (ch, sgr) in cells.items())
+            self.bytes_full += len(self._compose(full, self.cur, self.sgr)[0].encode())
+
+        frame, self.cur, self.sgr = self._compose(changed, self.cur, self.sgr)
+        self.lit = set(cells)
+        cells.clear()
+
+        if frame:
+            self.out.write(frame)
+        self.out.flush()
+        if self.stats:
+            self.frames += 1
+            self.bytes_sent += len(frame.encode())
+        return frame
+
+    def report(self):
+        n = max(1, self.frames)
+        full = self.bytes_full / n
+        sent = self.bytes_sent / n
+        saved = 100.0 * (1.0 - sent / full) if full else 0.0
+        return (f"frames={self.frames} bytes/frame full={full:.0f} "
+                f"diffed={sent:.0f} ({saved:.1f}% saved)")
+
+class SGRTable:
+    """
+    Pre-built SGR strings for every PALETTES colour and the lead greys, so a
+    cell's colour is one tuple index instead of an f-string per cell.
+    Equal colours share one string object.
+    """
+    def __init__(self, mode=COLOR_MODE):
+        self.mode = mode
+        self.palettes = []
+        self.leads = ()
+        self.rebuild(PALETTES)
+
+    def encode(self, rgb):
+        if self.mode == '256':
+            return set_256(rgb_to_256(*rgb))
+        return set_rgb(*rgb)
+
+    def rebuild(self, palettes):
+        interned = {}
+
+        def sgr(rgb):
+            s = interned.get(rgb)
+            if s is None:
+                s = interned[rgb] = self.encode(rgb)
+            return s
+
+        self.palettes = [tuple(sgr(c) for c in p) for p in palettes]
+        self.leads = tuple(sgr(c) for c in LEAD_COLORS)
+
 class Column:
-    def __init__(self, x, height, palette):
+    def __init__(self, x, height, palette, leads):
         self.x = x
         self.height = height
-        self.palette = palette
+        self.palette = palette      # SGR strings from SGRTable
+        self.leads = leads
         self.drops = deque()
         self.spawn_delay = random.randint(0, 30)
         self.speed = random.uniform(0.02, 0.12)
@@ -64,7 +245,8 @@ class Column:
             if random.random() < 0.15:
                 length = random.randint(3, min(20, self.height // 2))
                 head_pos = 0
-                self.drops.append({'pos': head_pos, 'len': length, 'age': 0, 'lead_color': None})
+                self.drops.append({'pos': head_pos, 'len': length, 'age': 0, 'lead_color': None,
+                                   'cells': deque()})
 
         new_drops = deque()
         for drop in self.drops:
@@ -73,40 +255,50 @@ class Column:
             # remove if past bottom
             if drop['pos'] - drop['len'] > self.height:
                 continue
+            # glyphs stay on the row the head dropped them on; the tail end falls off
+            cells = drop['cells']
+            cells.append([random.choice(CHARS), random.choice(self.palette)])
+            if len(cells) > drop['len']:
+                cells.popleft()
             new_drops.append(drop)
         self.drops = new_drops
 
-    def draw(self):
-        out = ''
+    def draw(self, frame):
         for drop in self.drops:
-            for i in range(drop['len']):
+            cells = drop['cells']
+            n = len(cells)
+            for i in range(min(n, drop['len'])):
                 y = drop['pos'] - i
                 if y <= 0 or y > self.height:
                     continue
+                cell = cells[n - 1 - i]
+                if random.random() < REROLL_CHANCE:
+                    cell[0] = random.choice(CHARS)
+                    cell[1] = random.choice(self.palette)
                 # choose color based on i (head brighter)
-                t = i / max(1, drop['len'] - 1)
                 if i == 0:
                     # lead - will be white/grey occasionally
                     if drop['lead_color'] is None:
                         if random.random() < 0.1:
-                            drop['lead_color'] = (255, 255, 255) if random.random() < 0.5 else (200, 200, 200)
+                            drop['lead_color'] = self.leads[0] if random.random() < 0.5 else self.leads[1]
                         else:
                             drop['lead_color'] = None
-                    color = drop['lead_color'] if drop['lead_color'] else random.choice(self.palette)
+                    color = drop['lead_color'] if drop['lead_color'] else cell[1]
                 else:
-                    # interpolate palette
-                    color = random.choice(self.palette)
-                ch = random.choice(CHARS)
-                out += f"{move(self.x, y)}{set_rgb(*color)}{ch}"
-        return out
+                    color = cell[1]
+                frame.put(self.x, y, cell[0], color)
 
 
 def main():
     cols, rows = shutil.get_terminal_size()
     hide_cursor()
 
+    sgr = SGRTable()
+
     # initialize columns
-    columns = [Column(x+1, rows, random.choice(PALETTES)) for x in range(cols)]
+    columns = [Column(x+1, rows, random.choice(sgr.palettes), sgr.leads) for x in range(cols)]
+
+    writer = FrameWriter(cols, rows, stats=STATS)
 
     palette_change_time = time.time() + 30
     try:
@@ -115,22 +307,23 @@ def main():
             now = time.time()
             if now > palette_change_time:
                 # change palettes randomly
+                sgr.rebuild(PALETTES)
                 for c in columns:
-                    c.palette = random.choice(PALETTES)
+                    c.palette = random.choice(sgr.palettes)
+                    c.leads = sgr.leads
                 palette_change_time = now + 30
 
-            frame = ''
             for c in columns:
                 c.step()
-                frame += c.draw()
-
-            sys.stdout.write(frame)
-            sys.stdout.flush()
+                c.draw(writer)
+            writer.flush()
             time.sleep(0.05)
     except KeyboardInterrupt:
         reset()
         show_cursor()
         clear()
+        if STATS:
+            sys.stderr.write(writer.report() + "\n")
         sys.exit(0)
 
 if __name__ == '__main__':
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+CPU bloom / phosphor / CRT post-processing for the raster backend.
+
+A NumPy port of the Metal post-FX chain in LiveMTRX-sdl/src/shaders, for
+render hosts without a GPU:
+
+    bright    bright_extract: keep pixels with luma >= BRIGHT_THRESHOLD,
+              measured on a 1/scale block-averaged copy of the frame
+    blur      blur_h + blur_v: the shaders' 9-tap separable gaussian (the 5
+              BLUR_WEIGHTS mirrored about the centre), at the reduced
+              resolution
+    phosphor  phosphor_blend: history = max(frame, history * PHOSPHOR_DECAY)
+    composite crt_final: history + bloom * BLOOM_GAIN, upsampled in place
+    warp      crt_final: barrel curvature as one precomputed gather of packed
+              pixels, red/blue offset by CHROMA_OFFSET of the width
+    mask      crt_final: scanlines * Trinitron shadow mask * vignette as one
+              precomputed per-pixel gain
+
+Full-resolution stages stay in uint8/uint16 on the (H, W, 4) RGBA layout of
+the raster framebuffer (no float conversion of the whole frame); only the
+reduced-resolution bloom is float32. Every buffer, index map and gain table
+is allocated in __init__, and stages write through out= into them, so
+apply() does not allocate frame-sized arrays. Stage times are accumulated;
+report() gives the mean per stage so a quality level can be picked per host.
+
+Differences from the shaders: the blur treats pixels past the border as
+black instead of clamping, the red/blue offset is a whole-pixel shift of the
+warped image, and those channels keep bloom and masks (crt_final overwrites
+them with raw base samples).
+"""
+import time
+
+import numpy as np
+
+# Shader constants
+BRIGHT_THRESHOLD = 0.9
+LUMA = (0.2126, 0.7152, 0.0722)
+BLUR_WEIGHTS = (0.227027, 0.1945946, 0.1216216, 0.054054, 0.016216)
+PHOSPHOR_DECAY = 0.88
+BLOOM_GAIN = 1.2
+CURVATURE = 0.08
+CHROMA_OFFSET = 0.0015
+SHADOW_MASK = ((1.0, 0.85, 0.85), (0.85, 1.0, 0.85), (0.85, 0.85, 1.0))
+SCAN_BASE, SCAN_AMOUNT = 0.85, 0.15
+VIGNETTE = (0.9, 0.3)   # smoothstep edges on distance from centre
+
+# quality -> (bloom downscale, curvature + chroma)
+QUALITY = {
+    'low': (4, False),
+    'medium': (2, False),
+    'high': (2, True),
+}
+
+STAGES = ('bright', 'blur', 'phosphor', 'composite', 'warp', 'mask')
+
+# Alpha byte of a packed RGBA pixel
+_OPAQUE = 0xff000000
+
+
+def _phases(a: np.ndarray, s: int, hs: int, ws: int):
+    """The s * s strided (hs, ws) views of a, one per position in an s x s block."""
+    return [a[dy:hs * s:s, dx:ws * s:s] for dy in range(s) for dx in range(s)]
+
+
+def _smoothstep(e0: float, e1: float, x: np.ndarray) -> np.ndarray:
+    t = np.clip((x - e0) / (e1 - e0), 0.0, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+class PostFX:
+    def __init__(self, width: int, height: int, quality: str = 'high'):
+        self.w = width
+        self.h = height
+        self.quality = quality
+        scale, warp = QUALITY[quality]
+        self.scale = scale
+        hs, ws = height // scale, width // scale
+        u16 = np.uint16
+
+        self.history = np.zeros((height, width, 4), dtype=np.uint8)
+        self.wide = np.zeros((height, width, 4), dtype=u16)      # uint16 scratch
+        # the same pixels as one uint64 word each (four uint16 lanes): strided
+        # per-pixel adds run on 2-D arrays instead of an inner axis of 4, and
+        # lanes never carry into each other (sums stay far below 65536)
+        self._wide64 = self.wide.view(np.uint64).reshape(height, width)
+        # composite as packed pixels, plus one opaque black pixel for the warp
+        self._comb_px = np.full(height * width + 1, _OPAQUE, dtype='<u4')
+        self.comb = self._comb_px[:height * width].view(np.uint8).reshape(height, width, 4)
+        self.warped = np.zeros((height, width, 4), dtype=np.uint8)
+        self.out = np.zeros((height, width, 4), dtype=np.uint8)
+
+        self.acc = np.zeros((hs, ws, 4), dtype=u16)
+        self._acc64 = self.acc.view(np.uint64).reshape(hs, ws)
+        self.bright = np.zeros((hs, ws, 4), dtype=np.float32)
+        self.blur_tmp = np.zeros((hs, ws, 4), dtype=np.float32)
+        self.scratch = np.zeros((hs, ws, 4), dtype=np.float32)
+        self.luma = np.zeros((hs, ws), dtype=np.float32)
+        self.mask = np.zeros((hs, ws), dtype=bool)
+        self.bloom = np.zeros((hs, ws, 4), dtype=u16)
+        self._bloom64 = self.bloom.view(np.uint64).reshape(hs, ws)
+        self._wide_phases = _phases(self._wide64, scale, hs, ws)
+        # bright pass weights: luma of the block sum, and the block mean in 0..1
+        self._luma_k = [k / (255.0 * scale * scale) for k in LUMA]
+        self._mean_k = np.array([1.0, 1.0, 1.0, 0.0], dtype=np.float32) / (255.0 * scale * scale)
+
+        ys = (np.arange(height, dtype=np.float64) + 0.5)[:, None]
+        xs = (np.arange(width, dtype=np.float64) + 0.5)[None, :]
+        u, v = xs / width, ys / height
+
+        # scanline * shadow mask * vignette in 1/256 steps; alpha passes through
+        scan = SCAN_BASE + SCAN_AMOUNT * np.sin(ys * np.pi)
+        vig = _smoothstep(VIGNETTE[0], VIGNETTE[1], np.hypot(u - 0.5, v - 0.5))
+        mask = np.array(SHADOW_MASK)[np.arange(width) % 3]       # (W, 3)
+        gain = np.empty((height, width, 4))
+        gain[:, :, :3] = (scan * vig)[:, :, None] * mask[None]
+        gain[:, :, 3] = 1.0
+        self.gain = np.round(gain * 256).astype(u16)
+
+        # source index per pixel into the packed composite (last = black)
+        self.warp = None
+        self.chroma = 0
+        if warp:
+            cu, cv = u - 0.5, v - 0.5
+            r2 = cu * cu + cv * cv
+            wu = u + cu * r2 * CURVATURE
+            wv = v + cv * r2 * CURVATURE
+            inside = (wu >= 0) & (wu <= 1) & (wv >= 0) & (wv <= 1)
+            row = np.clip((wv * height).astype(np.int64), 0, height - 1)
+            col = np.clip((wu * width).astype(np.int64), 0, width - 1)
+            self.warp = np.where(inside, row * width + col, height * width).astype(np.intp).ravel()
+            self.chroma = max(1, round(CHROMA_OFFSET * width))
+        self._warped_px = self.warped.view('<u4').reshape(-1)
+
+        self.times = dict.fromkeys(STAGES, 0.0)
+        self.frames = 0
+
+    def apply(self, fb: np.ndarray) -> np.ndarray:
+        """Run the chain on an (H, W, 4) uint8 RGBA frame; returns the shared output buffer."""
+        times = self.times
+        t0 = time.perf_counter()
+
+        # bright extract on block sums
+        acc = self.acc
+        acc64 = self._acc64
+        wide = self.wide
+        np.copyto(wide, fb)
+        phases = self._wide_phases
+        np.copyto(acc64, phases[0])
+        for ph in phases[1:]:
+            acc64 += ph
+        luma = self.luma
+        np.multiply(acc[:, :, 0], self._luma_k[0], out=luma)
+        for c in (1, 2):
+            np.multiply(acc[:, :, c], self._luma_k[c], out=self.scratch[:, :, 0])
+            luma += self.scratch[:, :, 0]
+        np.greater_equal(luma, BRIGHT_THRESHOLD, out=self.mask)
+        acc64 *= self.mask
+        bright = self.bright
+        np.multiply(acc, self._mean_k, out=bright)
+        t1 = time.perf_counter()
+        times['bright'] += t1 - t0
+
+        # separable 9-tap gaussian: bright -> blur_tmp (h) -> bright (v)
+        self._blur(bright, self.blur_tmp, axis=1)
+        self._blur(self.blur_tmp, bright, axis=0)
+        bright *= BLOOM_GAIN * 255.0
+        np.minimum(bright, 255.0, out=bright)
+        np.copyto(self.bloom, bright, casting='unsafe')
+        t2 = time.perf_counter()
+        times['blur'] += t2 - t1
+
+        # phosphor: history * decay in 1/256 steps, then max with the frame
+        hist = self.history
+        # dtype= pins the uint16 loop (NumPy 1.x would pick uint8 and wrap)
+        np.multiply(hist, round(PHOSPHOR_DECAY * 256), out=wide, dtype=np.uint16)
+        np.right_shift(wide, 8, out=hist, casting='unsafe')
+        np.maximum(hist, fb, out=hist)
+        t3 = time.perf_counter()
+        times['phosphor'] += t3 - t2
+
+        # composite: history + nearest-upsampled bloom, saturated
+        np.copyto(wide, hist)
+        for ph in phases:
+            ph += self._bloom64
+        np.minimum(wide, np.uint16(255), out=wide)
+        np.copyto(self.comb, wide, casting='unsafe')
+        t4 = time.perf_counter()
+        times['composite'] += t4 - t3
+
+        if self.warp is not None:
+            # mode='clip' writes straight into out (indices are in range)
+            np.take(self._comb_px, self.warp, out=self._warped_px, mode='clip')
+            warped = self.warped
+            d = self.chroma
+            # red samples right of the pixel, blue left of it; out (written
+            # in full by the mask stage) holds the unshifted planes
+            tmp = self.out
+            for c, dst, src in ((0, np.s_[:, :-d], np.s_[:, d:]), (2, np.s_[:, d:], np.s_[:, :-d])):
+                np.copyto(tmp[:, :, c], warped[:, :, c])
+                np.copyto(warped[dst + (c,)], tmp[src + (c,)])
+        else:
+            warped = self.comb
+        t5 = time.perf_counter()
+        times['warp'] += t5 - t4
+
+        np.multiply(warped, self.gain, out=wide)
+        np.right_shift(wide, 8, out=self.out, casting='unsafe')
+        times['mask'] += time.perf_counter() - t5
+        self.frames += 1
+        return self.out
+
+    def _blur(self, src: np.ndarray, dst: np.ndarray, axis: int):
+        w = BLUR_WEIGHTS
+        scratch = self.scratch
+        np.multiply(src, w[0], out=dst)
+        n = src.shape[axis]
+
+        def span(a, b):
+            idx = [slice(None)] * 3
+            idx[axis] = slice(a, b)
+            return tuple(idx)
+
+        for i in range(1, len(w)):
+            if 2 * i >= n:
+                break
+            # dst[x] += w * (src[x - i] + src[x + i]), one side at the borders
+            mid, left, right = span(i, n - i), span(0, n - 2 * i), span(2 * i, n)
+            np.add(src[left], src[right], out=scratch[mid])
+            scratch[mid] *= w[i]
+            dst[mid] += scratch[mid]
+            for d, s in ((span(0, i), span(i, 2 * i)), (span(n - i, n), span(n - 2 * i, n - i))):
+                np.multiply(src[s], w[i], out=scratch[d])
+                dst[d] += scratch[d]
+
+    def report(self) -> str:
+        n = max(1, self.frames)
+        total = sum(self.times.values())
+        parts = ' '.join(f'{k}={v / n * 1e3:.2f}' for k, v in self.times.items())
+        return f'postfx[{self.quality}] ms/frame: {parts} total={total / n * 1e3:.2f}'
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Off-screen raster backend for livemtrx.
+
+Runs the real draw() loop headless against a window that rasterizes into a
+NumPy RGBA framebuffer instead of a terminal. The glyphs come from the atlas
+baked by LiveMTRX-sdl/tools/bake_atlas.py: the JSON map plus its raw .bin
+tiles (memory-mapped) when present, else the PNG. Only the cells draw()
+writes are re-blitted: every refresh() gathers their atlas tiles, tints
+them with the cell colour and scatters them into the framebuffer through a
+(rows, cell, cols, cell) view in a single vectorized step. Pixels are packed
+RGBA words and tinting is one table lookup per pixel: each cell colour owns a
+256-entry row of packed pixels, one per coverage value.
+
+One frame is emitted per loop iteration at a fixed step of 1/--fps seconds.
+Frames go out as raw RGBA to a file or pipe, or as a PNG sequence:
+
+    python3 src/raster.py --size 1920x1080 --seconds 20 --out - | \\
+        ffmpeg -f rawvideo -pix_fmt rgba -s 1920x1080 -r 45 -i - loop.mp4
+    python3 src/raster.py --size 3840x2160 --frames 90 --png-dir frames/
+
+--fx low|medium|high runs each frame through the CPU bloom/phosphor/CRT
+chain in postfx.py before it is written.
+
+Colours follow the terminal: pair colours are xterm-256 indices; BOLD cells
+use full intensity, plain cells 0.7 and DIM halves the result, the same
+1.0 / 0.7 / 0.35 steps as the Metal renderer's tiers.
+
+Needs numpy, and Pillow to decode a PNG-only atlas or write PNGs.
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+import livemtrx as lm
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ATLAS = os.path.join(_HERE, '..', 'LiveMTRX-sdl', 'assets', 'glyph_atlas.png')
+DEFAULT_MAP = os.path.join(_HERE, '..', 'LiveMTRX-sdl', 'assets', 'glyph_map.json')
+
+SIZES = {'1080p': (1920, 1080), '1440p': (2560, 1440), '4k': (3840, 2160)}
+
+# Cell intensity by attr (see module docstring)
+INTENSITY_PLAIN = 0.7
+INTENSITY_BOLD = 1.0
+DIM_SCALE = 0.5
+
+# Raw atlas written by bake_atlas.py next to the PNG (see its docstring)
+BIN_MAGIC = b'LMATLAS1'
+BIN_HEADER = struct.Struct('<8sIII')
+
+# Alpha byte of a packed RGBA pixel (the background is opaque black)
+_OPAQUE = 0xff000000
+
+# xterm system colours 0..15
+_XTERM_BASIC = (
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+    (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255),
+)
+_CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+
+
+def xterm_rgb(n: int):
+    """RGB of xterm-256 colour n."""
+    if n < 16:
+        return _XTERM_BASIC[n]
+    if n < 232:
+        n -= 16
+        return _CUBE_LEVELS[n // 36], _CUBE_LEVELS[(n // 6) % 6], _CUBE_LEVELS[n % 6]
+    v = 8 + (n - 232) * 10
+    return v, v, v
+
+
+class Atlas:
+    """
+    Baked glyph atlas as an array of uint8 coverage tiles, in the order of
+    its map. With a .bin next to the map the tiles are a read-only view of
+    the mapped file. Glyphs missing from the atlas map to `blank`, one past
+    the last tile, which RasterScreen draws as an empty cell.
+    """
+    def __init__(self, png_path: str, map_path: str):
+        with open(map_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        cell, cols, count = meta['cell'], meta['cols'], meta['count']
+        bin_path = os.path.join(os.path.dirname(map_path), meta['bin']) if 'bin' in meta else None
+        if bin_path and os.path.exists(bin_path):
+            # raw tiles from the baker: mapped in place, no decode or copy
+            with open(bin_path, 'rb') as f:
+                magic, bin_cell, bin_count, off = BIN_HEADER.unpack(f.read(BIN_HEADER.size))
+            if magic != BIN_MAGIC or (bin_cell, bin_count) != (cell, count):
+                raise ValueError(f'{bin_path}: does not match {map_path}')
+            tiles = np.memmap(bin_path, dtype=np.uint8, mode='r', offset=off, shape=(count, cell, cell))
+        else:
+            from PIL import Image
+
+            img = np.asarray(Image.open(png_path).convert('RGBA'))[:, :, 3]
+            rows = (count + cols - 1) // cols
+            # (rows, cell, cols, cell) -> (rows * cols, cell, cell)
+            grid = img[:rows * cell, :cols * cell].reshape(rows, cell, cols, cell).swapaxes(1, 2)
+            tiles = np.ascontiguousarray(grid.reshape(rows * cols, cell, cell)[:count])
+        self.tiles = tiles
+        self.cell = cell
+        self.blank = count
+
+        mapping = meta['mapping']
+        self.index = {ch: i for ch, i in mapping.items()}
+        self.missing = [ch for ch in lm.GLYPHS if ch not in mapping]
+        if self.missing:
+            lm.log(f'raster: {len(self.missing)} glyphs not in the atlas, left out of the pools')
+
+    def lookup(self, ch: str) -> int:
+        return self.index.get(ch, self.blank)
+
+
+class RasterColors(lm.HeadlessColors):
+    """HeadlessColors that remembers which fg each pair was given."""
+    def __init__(self, colors: int = 256, pairs: int = 256):
+        self.fg_of = {}
+        super().__init__(colors, pairs)
+
+    def _init_pair(self, pid: int, fg: int):
+        self.fg_of[pid] = fg
+
+
+class RasterScreen:
+    """
+    Window for draw() that rasterizes into an RGBA framebuffer.
+
+    addstr() only queues (y, x, atlas tile, colour slot) per cell; refresh()
+    blits the queue. getch() hands the finished frame to `emit` and ends the
+    run with 'q' after `frames` frames.
+    """
+    def __init__(self, width: int, height: int, atlas: Atlas, cm: RasterColors, frames: int, emit):
+        self.atlas = atlas
+        self.cm = cm
+        self.emit = emit
+        self.max_frames = frames
+        self.frames = 0
+        self.blits = 0
+        c = atlas.cell
+        self.rows = height // c
+        self.cols = width // c
+        # packed little-endian RGBA words; fb is the same memory as bytes
+        self.pixels = np.full((height, width), _OPAQUE, dtype='<u4')
+        self.fb = self.pixels.view(np.uint8).reshape(height, width, 4)
+        # cell-major view of the pixels: [row, py, col, px]
+        s0, s1 = self.pixels.strides
+        self._cells = as_strided(self.pixels, shape=(self.rows, c, self.cols, c),
+                                 strides=(c * s0, s0, c * s1, s1))
+
+        self._ys = array('i')
+        self._xs = array('i')
+        self._gs = array('i')
+        self._bases = array('i')   # per cell: offset of its colour's table row
+        self._slot_of = {}         # attr -> offset into the colour tables
+        self._rows = []            # per colour: 256 packed pixels by coverage
+        self._table = np.zeros(0, dtype='<u4')
+        self._pair_epoch = -1
+
+    def getmaxyx(self):
+        return self.rows, self.cols
+
+    def nodelay(self, flag):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def erase(self):
+        self.pixels.fill(_OPAQUE)
+
+    def getch(self) -> int:
+        if self.frames:
+            self.emit(self.fb)
+        if self.frames >= self.max_frames:
+            return ord('q')
+        self.frames += 1
+        return -1
+
+    def _slot(self, attr: int) -> int:
+        fg = self.cm.fg_of.get(self.cm.pair_of(attr), 2)
+        k = INTENSITY_BOLD if attr & lm.curses.A_BOLD else INTENSITY_PLAIN
+        if attr & lm.curses.A_DIM:
+            k *= DIM_SCALE
+        base = self._slot_of[attr] = len(self._rows) * 256
+        cov = np.arange(256, dtype=np.uint32)
+        r, g, b = (cov * int(v * k) // 255 for v in xterm_rgb(fg))
+        self._rows.append(r | (g << 8) | (b << 16) | _OPAQUE)
+        return base
+
+    def addstr(self, y, x, s, attr=0):
+        if not (0 <= y < self.rows and 0 <= x < self.cols):
+            return
+        s = s[:self.cols - x]
+        n = len(s)
+        if self.cm.evictions != self._pair_epoch:
+            # an evicted pair was given a new colour: attr -> colour changed.
+            # Blit what is queued against the old rows, then start over.
+            self.refresh()
+            self._slot_of.clear()
+            self._rows.clear()
+            self._table = self._table[:0]
+            self._pair_epoch = self.cm.evictions
+        base = self._slot_of.get(attr)
+        if base is None:
+            base = self._slot(attr)
+        lookup = self.atlas.lookup
+        self._ys.extend([y] * n)
+        self._xs.extend(range(x, x + n))
+        self._gs.extend([lookup(ch) for ch in s])
+        self._bases.extend([base] * n)
+
+    def addch(self, y, x, ch, attr=0):
+        self.addstr(y, x, ch, attr)
+
+    def refresh(self):
+        if not self._ys:
+            return
+        if len(self._table) != 256 * len(self._rows):
+            self._table = np.concatenate(self._rows)
+        ys = np.array(self._ys, dtype=np.int32)
+        xs = np.array(self._xs, dtype=np.int32)
+        gs = np.array(self._gs, dtype=np.int32)
+        blank = gs == self.atlas.blank
+        any_blank = blank.any()
+        if any_blank:
+            gs[blank] = 0
+        cov = self.atlas.tiles[gs]
+        if any_blank:
+            cov[blank] = 0
+        # coverage + colour row offset -> packed pixel, (n, cell, cell); the
+        # uint8 tiles are widened here, per blitted tile
+        idx = np.add(cov, np.array(self._bases, dtype=np.int32)[:, None, None], dtype=np.int32)
+        self._cells[ys, :, xs, :] = np.take(self._table, idx)
+        self.blits += len(ys)
+        for buf in (self._ys, self._xs, self._gs, self._bases):
+            del buf[:]
+
+
+class RawSink:
+    """Raw RGBA frames, back to back, to a file or '-' (stdout)."""
+    def __init__(self, path: str):
+        self.f = sys.stdout.buffer if path == '-' else open(path, 'wb')
+
+    def __call__(self, fb):
+        self.f.write(memoryview(fb).cast('B'))
+
+    def close(self):
+        self.f.flush()
+        if self.f is not sys.stdout.buffer:
+            self.f.close()
+
+
+class PngSink:
+    """Numbered PNG files in a directory."""
+    def __init__(self, directory: str):
+        from PIL import Image
+        self._image = Image
+        self.dir = directory
+        self.n = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, fb):
+        self._image.fromarray(fb, 'RGBA').save(os.path.join(self.dir, f'frame_{self.n:05d}.png'))
+        self.n += 1
+
+    def close(self):
+        pass
+
+
+def parse_size(text: str):
+    if text.lower() in SIZES:
+        return SIZES[text.lower()]
+    w, h = text.lower().split('x')
+    return int(w), int(h)
+
+
+def render(width: int, height: int, frames: int, fps: float, density: float, seed: int,
+           atlas: Atlas, emit):
+    """Run draw() into a RasterScreen; returns the screen."""
+    lm.reseed(seed)
+    cm = RasterColors()
+    scr = RasterScreen(width, height, atlas, cm, frames, emit)
+    t = 1000.0
+    step = 1.0 / fps
+    frame = 0
+
+    def clock() -> float:
+        return t + frame * step
+
+    def sleep(_secs: float):
+        nonlocal frame
+        frame += 1
+
+    lm.draw(scr, clock=clock, sleep=sleep, cm=cm, density=density)
+    return scr
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Render livemtrx into RGBA frames without a display.')
+    p.add_argument('--size', default='1080p', help='WxH or 1080p/1440p/4k')
+    p.add_argument('--frames', type=int, default=None)
+    p.add_argument('--seconds', type=float, default=10.0)
+    p.add_argument('--fps', type=float, default=lm.TARGET_FPS)
+    p.add_argument('--density', type=float, default=lm.DEFAULT_DENSITY)
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--atlas', default=DEFAULT_ATLAS)
+    p.add_argument('--map', default=DEFAULT_MAP)
+    p.add_argument('--out', default=None, help="raw RGBA output file, '-' = stdout")
+    p.add_argument('--png-dir', default=None, help='write a PNG sequence here')
+    p.add_argument('--fx', default='off', choices=('off', 'low', 'medium', 'high'),
+                   help='CPU bloom/phosphor/CRT post-processing quality (postfx.py)')
+    args = p.parse_args(argv)
+
+    width, height = parse_size(args.size)
+    frames = args.frames if args.frames is not None else int(args.seconds * args.fps)
+    atlas = Atlas(args.atlas, args.map)
+    # streams only pick glyphs the atlas has; anything else is drawn blank
+    lm.restrict_glyphs(atlas.index)
+    if args.png_dir:
+        sink = PngSink(args.png_dir)
+    elif args.out:
+        sink = RawSink(args.out)
+    else:
+        sink = RawSink(os.devnull)
+    emit = sink
+    fx = None
+    if args.fx != 'off':
+        from postfx import PostFX
+        fx = PostFX(width, height, args.fx)
+
+        def emit(fb):
+            sink(fx.apply(fb))
+    t0 = time.perf_counter()
+    scr = render(width, height, frames, args.fps, args.density, args.seed, atlas, emit)
+    wall = time.perf_counter() - t0
+    close = getattr(sink, 'close', None)
+    if close is not None:
+        close()
+    sys.stderr.write(f'{scr.frames} frames {width}x{height} ({scr.cols}x{scr.rows} cells) '
+                     f'in {wall:.2f}s = {scr.frames / wall:.1f} fps, '
+                     f'{scr.blits / max(1, scr.frames):.0f} cells blitted/frame\n')
+    if fx is not None:
+        sys.stderr.write(fx.report() + '\n')
+
+
+if __name__ == '__main__':
+    main()
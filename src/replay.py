@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Deterministic record/replay for livemtrx.
+
+A live run with LIVEMTRX_RECORD=<file> captures everything draw() takes from
+the outside world: the seed, the terminal size, keys, control-channel
+commands and every clock() reading (quantized to microseconds, so replay
+hands back bit-identical floats). Replay feeds the same inputs to the real
+draw() headless, without sleeping, and prints a hash of the screen after
+every refresh, so renderer changes can be checked for speed and for
+identical output:
+
+    LIVEMTRX_RECORD=session.lmrec python3 src/livemtrx.py
+    python3 src/replay.py session.lmrec --hashes before.txt
+    python3 src/replay.py session.lmrec --expect before.txt
+
+The LIVEMTRX_* settings of the recorded run are stored too and restored for
+the replay. The power governor reads CPU time, which cannot be replayed, so
+recordings run without LIVEMTRX_CPU_BUDGET.
+
+File format: a magic line, then zlib-compressed JSON with the clock as
+microsecond deltas and keys, sizes and commands as sparse (call index, value)
+lists.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import zlib
+from array import array
+
+MAGIC = b'LMREC1\n'
+
+# env settings that do not change what gets drawn (or are replaced on replay)
+_ENV_SKIP = ('LIVEMTRX_RECORD', 'LIVEMTRX_SEED', 'LIVEMTRX_CONTROL', 'LIVEMTRX_CPU_BUDGET',
+             'LIVEMTRX_DEBUG', 'LIVEMTRX_PROFILE_PATH')
+
+# set in the environment of a replay that re-executed itself with the recorded settings
+_REEXEC_MARK = '_LIVEMTRX_REPLAY'
+
+
+def recorded_env() -> dict:
+    return {k: v for k, v in os.environ.items()
+            if k.startswith('LIVEMTRX_') and k not in _ENV_SKIP}
+
+
+def save(path: str, rec: dict):
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(zlib.compress(json.dumps(rec, separators=(',', ':')).encode(), 9))
+
+
+def load(path: str) -> dict:
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f'{path}: not a livemtrx recording')
+    return json.loads(zlib.decompress(data[len(MAGIC):]))
+
+
+# -- recording -----------------------------------------------------------------
+
+class RecordingScreen:
+    """Passes through to the curses window, logging getch() and getmaxyx()."""
+    def __init__(self, stdscr, keys: list, sizes: list):
+        self._scr = stdscr
+        self._keys = keys
+        self._sizes = sizes
+        self._n_getch = 0
+        self._n_size = 0
+        self._size = None
+
+    def getch(self) -> int:
+        k = self._scr.getch()
+        if k != -1:
+            self._keys.append((self._n_getch, k))
+        self._n_getch += 1
+        return k
+
+    def getmaxyx(self):
+        size = self._scr.getmaxyx()
+        if size != self._size:
+            self._sizes.append((self._n_size, size[0], size[1]))
+            self._size = size
+        self._n_size += 1
+        return size
+
+    def __getattr__(self, name):
+        return getattr(self._scr, name)
+
+
+class RecordingControl:
+    """Wraps a ControlChannel, logging the lines each poll() returned."""
+    def __init__(self, inner, commands: list):
+        self._inner = inner
+        self._commands = commands
+        self._n_poll = 0
+
+    def poll(self):
+        lines = self._inner.poll()
+        if lines:
+            self._commands.append((self._n_poll, lines))
+        self._n_poll += 1
+        return lines
+
+    def close(self):
+        self._inner.close()
+
+
+def record(stdscr, path: str):
+    """curses.wrapper() target: run draw() live and save its inputs to path."""
+    import livemtrx as lm
+
+    seed = int(lm.SEED) if lm.SEED is not None else random.SystemRandom().getrandbits(32)
+    # a fixed seed also makes the 'r' key reseed from the RNG, not the wall clock
+    lm.SEED = seed
+    if lm.CPU_BUDGET > 0:
+        lm.log('record: power governor disabled (CPU time cannot be replayed)')
+        lm.CPU_BUDGET = 0.0
+
+    rec = {'seed': seed, 'env': recorded_env(), 'keys': [], 'sizes': [], 'commands': []}
+    clock_us = array('q')
+
+    def clock() -> float:
+        # quantized so replay can rebuild the exact same floats
+        us = int(lm.now() * 1e6)
+        clock_us.append(us)
+        return us / 1e6
+
+    cm = lm.ColorManager()
+    rec['colors'] = lm.curses.COLORS
+    rec['pairs'] = lm.curses.COLOR_PAIRS
+    control = lm.ControlChannel(lm.CONTROL_PATH) if lm.CONTROL_PATH else None
+    rec['control'] = control is not None
+    if control is not None:
+        control = RecordingControl(control, rec['commands'])
+    try:
+        lm.draw(RecordingScreen(stdscr, rec['keys'], rec['sizes']), clock=clock, cm=cm,
+                control=control)
+    finally:
+        prev = 0
+        deltas = []
+        for us in clock_us:
+            deltas.append(us - prev)
+            prev = us
+        rec['clock_us'] = deltas
+        save(path, rec)
+        lm.log(f'record: {len(deltas)} clock reads, {len(rec["keys"])} keys -> {path}')
+
+
+# -- replay ---------------------------------------------------------------------
+
+class ReplayEnd(Exception):
+    """The recording ran out of clock readings (the live run was interrupted)."""
+
+
+class ReplayScreen:
+    """
+    Headless window that plays back recorded keys and sizes and keeps the
+    characters and attrs curses would show, hashing them on every refresh().
+    """
+    def __init__(self, keys, sizes):
+        self._keys = {i: k for i, k in keys}
+        self._sizes = {i: (h, w) for i, h, w in sizes}
+        self._n_getch = 0
+        self._n_size = 0
+        self.size = self._sizes.get(0, (24, 80))
+        self.h, self.w = self.size
+        self.chars = [[' '] * self.w for _ in range(self.h)]
+        self.attrs = [array('q', bytes(8 * self.w)) for _ in range(self.h)]
+        self.hashes = []
+        self.loops = 0
+
+    def nodelay(self, flag):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def getch(self) -> int:
+        k = self._keys.get(self._n_getch, -1)
+        self._n_getch += 1
+        self.loops += 1
+        return k
+
+    def getmaxyx(self):
+        size = self._sizes.get(self._n_size)
+        self._n_size += 1
+        if size is not None and size != self.size:
+            self._resize(*size)
+        return self.size
+
+    def _resize(self, h: int, w: int):
+        # curses keeps the overlapping part of the screen
+        for row, attr in zip(self.chars, self.attrs):
+            if w < self.w:
+                del row[w:]
+                del attr[w:]
+            else:
+                row.extend([' '] * (w - self.w))
+                attr.extend(array('q', bytes(8 * (w - self.w))))
+        del self.chars[h:]
+        del self.attrs[h:]
+        for _ in range(len(self.chars), h):
+            self.chars.append([' '] * w)
+            self.attrs.append(array('q', bytes(8 * w)))
+        self.size = (h, w)
+        self.h, self.w = h, w
+
+    def addstr(self, y, x, s, attr=0):
+        if 0 <= y < self.h and 0 <= x < self.w:
+            s = s[:self.w - x]
+            self.chars[y][x:x + len(s)] = s
+            self.attrs[y][x:x + len(s)] = array('q', [attr]) * len(s)
+
+    def addch(self, y, x, ch, attr=0):
+        self.addstr(y, x, ch, attr)
+
+    def erase(self):
+        self.chars = [[' '] * self.w for _ in range(self.h)]
+        self.attrs = [array('q', bytes(8 * self.w)) for _ in range(self.h)]
+
+    def refresh(self):
+        hs = hashlib.blake2b(digest_size=8)
+        for row, attr in zip(self.chars, self.attrs):
+            hs.update(''.join(row).encode())
+            hs.update(attr)
+        self.hashes.append(hs.hexdigest())
+
+
+class ReplayControl:
+    def __init__(self, commands):
+        self._commands = {i: lines for i, lines in commands}
+        self._n_poll = 0
+
+    def poll(self):
+        lines = self._commands.get(self._n_poll, [])
+        self._n_poll += 1
+        return lines
+
+    def close(self):
+        pass
+
+
+def replay(rec: dict):
+    """Run draw() on the recorded inputs; returns (ReplayScreen, wall seconds)."""
+    import livemtrx as lm
+
+    lm.SEED = rec['seed']
+    lm.CPU_BUDGET = 0.0
+    ticks = iter(rec['clock_us'])
+    us = 0
+
+    def clock() -> float:
+        nonlocal us
+        try:
+            us += next(ticks)
+        except StopIteration:
+            raise ReplayEnd from None
+        return us / 1e6
+
+    scr = ReplayScreen(rec['keys'], rec['sizes'])
+    control = ReplayControl(rec['commands']) if rec['control'] else None
+    t0 = time.perf_counter()
+    try:
+        lm.draw(scr, clock=clock, sleep=lambda _secs: None,
+                cm=lm.HeadlessColors(rec['colors'], rec['pairs']), control=control)
+    except ReplayEnd:
+        pass
+    return scr, time.perf_counter() - t0
+
+
+def _restore_env(env: dict):
+    """Re-run this process with the recorded LIVEMTRX_* settings (read at import)."""
+    if recorded_env() == env or os.environ.get(_REEXEC_MARK):
+        return
+    new = {k: v for k, v in os.environ.items() if not k.startswith('LIVEMTRX_')}
+    new.update(env)
+    new[_REEXEC_MARK] = '1'
+    sys.stdout.flush()
+    os.execve(sys.executable, [sys.executable] + sys.argv, new)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Replay a livemtrx recording headless.')
+    p.add_argument('recording')
+    p.add_argument('--hashes', default=None, help='write per-frame screen hashes here')
+    p.add_argument('--expect', default=None, help='compare against a --hashes file')
+    args = p.parse_args(argv)
+
+    rec = load(args.recording)
+    _restore_env(rec['env'])
+    scr, wall = replay(rec)
+
+    n = len(scr.hashes)
+    fps = scr.loops / wall if wall > 0 else 0.0
+    final = scr.hashes[-1] if n else '-'
+    print(f'loops={scr.loops} frames={n} wall={wall:.3f}s ({fps:.0f} loops/s) final={final}')
+    if args.hashes:
+        with open(args.hashes, 'w') as f:
+            f.writelines(f'{i} {hs}\n' for i, hs in enumerate(scr.hashes))
+    if args.expect:
+        with open(args.expect) as f:
+            expected = [line.split()[1] for line in f if line.strip()]
+        for i, (a, b) in enumerate(zip(scr.hashes, expected)):
+            if a != b:
+                print(f'mismatch at frame {i}: {a} != {b}')
+                return 1
+        if len(expected) != n:
+            print(f'frame count differs: {n} != {len(expected)}')
+            return 1
+        print(f'all {n} frames match')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Bridge between the Python stream simulation and the C sim API
+(LiveMTRX-sdl/src/sim.h).
+
+GlyphInstance and SimFrame are mirrored as ctypes structures. An
+InstanceBuffer owns one array('i') of packed {x, y, glyph, tier} records;
+the SimFrame handed to native code and the memoryview are views of that same
+memory, so a frame is written once and read in place with no serialization.
+
+RefSim is the Python stream simulation writing its frames into one, and the
+reference for sim.c: draw()'s stream rules (spawn, advance,
+respawn, tail mutations) minus the terminal-only parts (partial redraw,
+halo, palettes), exposing the sim.h calls. Its random numbers come from
+SplitMix64 with the conversions spelled out below, so the C port can
+reproduce every frame bit for bit. check() runs a compiled sim.c through
+ctypes next to RefSim and compares the frames:
+
+    cc -O2 -shared -fPIC -o /tmp/libsim.so LiveMTRX-sdl/src/sim.c
+    python3 src/simbridge.py /tmp/libsim.so --size 160x50 --frames 2000
+
+Instances are ordered by column, then trail index from the head down.
+"""
+import argparse
+import ctypes
+import sys
+from array import array
+
+import livemtrx as lm
+
+_M64 = (1 << 64) - 1
+
+# ints per GlyphInstance record
+_FIELDS = 4
+
+# Defaults of sim.c
+SIM_DENSITY = lm.DEFAULT_DENSITY
+SIM_GLYPHS = 256
+
+
+class GlyphInstance(ctypes.Structure):
+    _fields_ = [('x', ctypes.c_int), ('y', ctypes.c_int),
+                ('glyph', ctypes.c_int), ('tier', ctypes.c_int)]
+
+
+class SimFrame(ctypes.Structure):
+    _fields_ = [('instances', ctypes.POINTER(GlyphInstance)), ('count', ctypes.c_int)]
+
+
+class InstanceBuffer:
+    """
+    Fixed-capacity GlyphInstance storage. Writers fill `ints` (four ints per
+    instance) and set `count`; frame() and view() expose the same bytes
+    without copying.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ints = array('i', bytes(ctypes.sizeof(GlyphInstance) * capacity))
+        self._instances = (GlyphInstance * capacity).from_buffer(self.ints)
+        self.count = 0
+
+    def frame(self) -> SimFrame:
+        return SimFrame(ctypes.cast(self._instances, ctypes.POINTER(GlyphInstance)), self.count)
+
+    def view(self) -> memoryview:
+        """The current frame as a flat memoryview of ints."""
+        return memoryview(self.ints)[:self.count * _FIELDS]
+
+
+class SplitMix64:
+    """The sim's RNG; sim.c implements the same three draws."""
+    def __init__(self, seed: int):
+        self.state = seed & _M64
+
+    def next(self) -> int:
+        self.state = z = (self.state + 0x9E3779B97F4A7C15) & _M64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _M64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _M64
+        return z ^ (z >> 31)
+
+    def random(self) -> float:
+        """Uniform in [0, 1): the top 53 bits."""
+        return (self.next() >> 11) * (1.0 / 9007199254740992.0)
+
+    def below(self, n: int) -> int:
+        return self.next() % n
+
+    def uniform(self, a: float, b: float) -> float:
+        return a + (b - a) * self.random()
+
+
+class RefStream:
+    __slots__ = ('x', 'y', 'speed', 'length', 'active', 'last_head', 'ring', 'head')
+
+    def __init__(self, x: int):
+        self.x = x
+        self.ring = array('i', bytes(4 * lm.STREAM_LEN_MAX))
+        self.head = 0
+
+
+class RefSim:
+    """Python reference implementation of sim.h (see the module docstring)."""
+    def __init__(self, width: int, height: int, seed: int = 0,
+                 density: float = SIM_DENSITY, glyphs: int = SIM_GLYPHS):
+        self.w = width
+        self.h = height
+        self.density = density
+        self.glyphs = glyphs
+        self.rng = SplitMix64(seed)
+        self.buf = InstanceBuffer(width * height)
+        self.streams = []
+        for x in range(width):
+            s = RefStream(x)
+            self._respawn(s)
+            self.streams.append(s)
+
+    def _glyph(self) -> int:
+        return self.rng.below(self.glyphs)
+
+    def _respawn(self, s: RefStream):
+        rng = self.rng
+        length = lm.STREAM_LEN_MIN + rng.below(lm.STREAM_LEN_MAX - lm.STREAM_LEN_MIN + 1)
+        s.active = rng.random() < self.density
+        s.head = 0
+        for i in range(length):
+            s.ring[i] = self._glyph()
+        s.length = length
+        s.y = rng.uniform(-length * 2.0, 0.0)
+        s.speed = rng.uniform(lm.BASE_SPEED_MIN, lm.BASE_SPEED_MAX)
+        s.last_head = -10_000
+
+    def step(self, dt: float):
+        rng = self.rng
+        smax = lm.STREAM_LEN_MAX
+        density = self.density
+        for s in self.streams:
+            if not s.active:
+                if rng.random() < density * 0.02:
+                    self._respawn(s)
+                    s.active = True
+                continue
+
+            s.y += s.speed * dt
+            head = int(s.y)
+            if head != s.last_head:
+                steps = head - s.last_head
+                if steps > 0:
+                    for _ in range(min(steps, s.length)):
+                        s.head = (s.head - 1) % smax
+                        s.ring[s.head] = self._glyph()
+                s.last_head = head
+
+            if head - s.length > self.h + 2:
+                if rng.random() < density:
+                    self._respawn(s)
+                    s.active = True
+                else:
+                    s.active = False
+                continue
+
+            if rng.random() < 0.06 and s.length > 1:
+                idx = rng.below(max(1, int(s.length * 0.5)))
+                s.ring[(s.head + idx) % smax] = self._glyph()
+            elif rng.random() < 0.015:
+                idx = rng.below(s.length)
+                s.ring[(s.head + idx) % smax] = self._glyph()
+
+    def get_frame(self) -> SimFrame:
+        out = self.buf.ints
+        h = self.h
+        smax = lm.STREAM_LEN_MAX
+        k = 0
+        for s in self.streams:
+            if not s.active:
+                continue
+            head = int(s.y)
+            lut = lm.INTENSITY_LUTS[s.length]
+            for i in range(s.length):
+                y = head - i
+                if 0 <= y < h:
+                    out[k] = s.x
+                    out[k + 1] = y
+                    out[k + 2] = s.ring[(s.head + i) % smax]
+                    out[k + 3] = lut[i]
+                    k += _FIELDS
+        self.buf.count = k // _FIELDS
+        return self.buf.frame()
+
+
+def load_sim(path: str):
+    lib = ctypes.CDLL(path)
+    lib.sim_init.argtypes = (ctypes.c_int, ctypes.c_int)
+    lib.sim_init.restype = ctypes.c_bool
+    lib.sim_step.argtypes = (ctypes.c_double,)
+    lib.sim_get_frame.restype = SimFrame
+    lib.sim_configure.argtypes = (ctypes.c_uint64, ctypes.c_double, ctypes.c_int)
+    return lib
+
+
+def check(lib_path: str, width: int, height: int, frames: int, dt: float, seed: int,
+          density: float = SIM_DENSITY, glyphs: int = SIM_GLYPHS):
+    """
+    Step the native sim and RefSim side by side; returns (frames compared,
+    first mismatching frame or None). Native frames are read in place.
+    """
+    lib = load_sim(lib_path)
+    lib.sim_configure(seed, density, glyphs)
+    if not lib.sim_init(width, height):
+        raise RuntimeError('sim_init failed')
+    ref = RefSim(width, height, seed, density, glyphs)
+    try:
+        for n in range(frames):
+            lib.sim_step(dt)
+            ref.step(dt)
+            native = lib.sim_get_frame()
+            ref.get_frame()
+            size = native.count * ctypes.sizeof(GlyphInstance)
+            if native.count != ref.buf.count or (
+                    size and ctypes.string_at(native.instances, size) != ref.buf.view().tobytes()):
+                return n, n
+        return frames, None
+    finally:
+        lib.sim_shutdown()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Check a compiled sim.c against the Python reference sim.')
+    p.add_argument('library', help='shared library built from LiveMTRX-sdl/src/sim.c')
+    p.add_argument('--size', default='160x50', help='grid WxH in cells')
+    p.add_argument('--frames', type=int, default=2000)
+    p.add_argument('--dt', type=float, default=lm.DT)
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--density', type=float, default=SIM_DENSITY)
+    p.add_argument('--glyphs', type=int, default=SIM_GLYPHS)
+    args = p.parse_args(argv)
+
+    w, h = (int(v) for v in args.size.lower().split('x'))
+    done, bad = check(args.library, w, h, args.frames, args.dt, args.seed, args.density, args.glyphs)
+    if bad is not None:
+        print(f'frame {bad} differs from the reference sim')
+        return 1
+    print(f'all {done} frames match')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+NumPy structure-of-arrays stream engine for livemtrx.
+
+Optional replacement for the per-object ColumnStream loop in draw(): every
+column's y, speed, length, active flag and glyph trail live in flat arrays,
+and a frame is advanced for all columns at once with a handful of vectorized
+steps. step() mirrors the rules of the Python loop (reactivation, partial
+head redraw, offscreen reset, tail mutations, full column redraw) and returns
+only the cells whose glyph/tier/colour changed since they were last emitted.
+
+Enable with LIVEMTRX_ENGINE=numpy.
+"""
+import numpy as np
+
+import livemtrx as lm
+
+TIER_HALO = lm.TIER_HALO
+
+# Packed cell key layout for the engine's own diff cache
+_TIER_SHIFT = 16
+_PAL_SHIFT = 19
+
+
+class SoAEngine:
+    def __init__(self, h: int, w: int, density: float, seed=None):
+        self.h = h
+        self.w = w
+        self.rng = np.random.default_rng(seed)
+        self.cap = lm.STREAM_LEN_MAX
+
+        self.y = np.zeros(w, dtype=np.float64)
+        self.speed = np.zeros(w, dtype=np.float64)
+        self.length = np.zeros(w, dtype=np.int64)
+        self.active = np.zeros(w, dtype=bool)
+        self.last_head = np.zeros(w, dtype=np.int64)
+        # glyph trail ring: trail index i lives at ring[x, (head_off[x] + i) % cap]
+        self.ring = np.zeros((w, self.cap), dtype=np.uint16)
+        self.head_off = np.zeros(w, dtype=np.int64)
+
+        # intensity tiers for every (length, index), shared by all columns
+        self.tiers = np.full((self.cap + 1, self.cap), 2, dtype=np.uint8)
+        for n in range(1, self.cap + 1):
+            self.tiers[n, :n] = np.frombuffer(lm.INTENSITY_LUTS[n], dtype=np.uint8)
+
+        # last emitted key per cell, -1 = unknown (always re-emit)
+        self.cache = np.full((h, w), -1, dtype=np.int64)
+
+        self._n_ascii = len(lm.ASCII_POOL)
+        self._n_uni = len(lm.UNICODE_GLYPHS)
+
+        self._spawn(np.arange(w), density, force_active=False)
+
+    def _glyphs(self, n: int) -> np.ndarray:
+        # same mix as rand_glyph(): GLYPH_MIX unicode, rest ASCII
+        rng = self.rng
+        out = rng.integers(0, self._n_ascii, size=n)
+        if self._n_uni:
+            uni = rng.random(n) < lm.GLYPH_MIX
+            out[uni] = self._n_ascii + rng.integers(0, self._n_uni, size=int(uni.sum()))
+        return out.astype(np.uint16)
+
+    def _spawn(self, cols: np.ndarray, density: float, force_active: bool):
+        n = cols.size
+        if n == 0:
+            return
+        rng = self.rng
+        length = rng.integers(lm.STREAM_LEN_MIN, lm.STREAM_LEN_MAX + 1, size=n)
+        self.length[cols] = length
+        self.y[cols] = rng.uniform(-length * 2.0, 0.0)
+        self.speed[cols] = rng.uniform(lm.BASE_SPEED_MIN, lm.BASE_SPEED_MAX, size=n)
+        self.active[cols] = True if force_active else rng.random(n) < density
+        self.last_head[cols] = -10_000
+        self.head_off[cols] = 0
+        self.ring[cols] = self._glyphs(n * self.cap).reshape(n, self.cap)
+
+    def resize(self, h: int, w: int, density: float):
+        """Keep surviving columns, spawn only added ones, crop/grow the cache."""
+        old_w = self.w
+        if w < old_w:
+            for name in ('y', 'speed', 'length', 'active', 'last_head', 'ring', 'head_off'):
+                setattr(self, name, getattr(self, name)[:w].copy())
+        elif w > old_w:
+            n = w - old_w
+            for name in ('y', 'speed', 'length', 'active', 'last_head', 'ring', 'head_off'):
+                a = getattr(self, name)
+                setattr(self, name, np.concatenate((a, np.zeros((n,) + a.shape[1:], dtype=a.dtype))))
+            self._spawn(np.arange(old_w, w), density, force_active=False)
+
+        cache = np.full((h, w), -1, dtype=np.int64)
+        keep_h, keep_w = min(h, self.h), min(w, old_w)
+        cache[:keep_h, :keep_w] = self.cache[:keep_h, :keep_w]
+        self.cache = cache
+        self.h = h
+        self.w = w
+
+    def next_crossing_dv(self):
+        """Time (at speed_factor 1) until the next head crosses a row, None if idle."""
+        act = self.active
+        if not act.any():
+            return None
+        y = self.y[act]
+        return float(np.min((np.floor(y) + 1.0 - y) / self.speed[act]))
+
+    def invalidate(self, y: int, x: int):
+        """A cell was overwritten outside the engine (fade/grain)."""
+        if 0 <= y < self.h and 0 <= x < self.w:
+            self.cache[y, x] = -1
+
+    def invalidate_all(self):
+        """Palette changed: every cached colour index is stale."""
+        self.cache.fill(-1)
+
+    def _emit_trail(self, cols, head, length, limit):
+        # cells head - i for i < min(limit, length), plus the halo at head + 1
+        h = self.h
+        i = np.arange(limit)
+        ok = i[None, :] < np.minimum(limit, length)[:, None]
+        ys = head[:, None] - i[None, :]
+        ok &= (ys >= 0) & (ys < h)
+        pos = (self.head_off[cols][:, None] + i[None, :]) % self.cap
+        glyph = self.ring[cols[:, None], pos]
+        tier = self.tiers[length[:, None], i[None, :]]
+        pal = np.broadcast_to(self._pal[cols][:, None], ok.shape)
+        xs = np.broadcast_to(cols[:, None], ok.shape)
+
+        halo = ok[:, 0] & (head + 1 < h)
+        return (
+            np.concatenate((ys[ok], head[halo] + 1)),
+            np.concatenate((xs[ok], cols[halo])),
+            np.concatenate((glyph[ok], glyph[halo, 0])),
+            np.concatenate((tier[ok], np.full(int(halo.sum()), TIER_HALO, dtype=np.uint8))),
+            np.concatenate((pal[ok], np.zeros(int(halo.sum()), dtype=np.int64))),
+        )
+
+    def step(self, dt: float, speed_factor: float, density: float, n_pal: int):
+        """
+        Advance every column by dt and return (ys, xs, glyphs, tiers, pals)
+        for the cells that changed. glyphs index lm.GLYPHS, tiers follow the
+        intensity LUT (TIER_HALO for the head halo) and pals index the theme
+        palette chosen for that column this frame.
+        """
+        rng = self.rng
+        h, cap = self.h, self.cap
+        w = self.w
+
+        act = np.flatnonzero(self.active)
+
+        # occasionally (re)activate idle columns with a fresh spawn
+        idle = np.flatnonzero(~self.active)
+        if idle.size:
+            self._spawn(idle[rng.random(idle.size) < density * 0.02], density, force_active=True)
+
+        # one body colour per column per frame
+        self._pal = rng.integers(0, max(1, n_pal), size=w)
+
+        # advance heads
+        y = self.y[act] + self.speed[act] * (speed_factor * dt)
+        self.y[act] = y
+        head = y.astype(np.int64)   # truncates toward zero like int()
+        length = self.length[act]
+        last = self.last_head[act]
+        moved = head != last
+        steps = np.minimum(head - last, length)
+        crossed = moved & (steps > 0)
+        self.last_head[act[moved]] = head[moved]
+
+        # shift new glyphs in at the head: O(1) per glyph via the ring offset
+        cols = act[crossed]
+        if cols.size:
+            k = steps[crossed]
+            off = (self.head_off[cols] - k) % cap
+            self.head_off[cols] = off
+            j = np.arange(cap)
+            fill = j[None, :] < k[:, None]
+            rows = np.broadcast_to(cols[:, None], fill.shape)[fill]
+            pos = ((off[:, None] + j[None, :]) % cap)[fill]
+            self.ring[rows, pos] = self._glyphs(rows.size)
+
+        parts = []
+        if lm.PARTIAL_REDRAW:
+            if cols.size:
+                parts.append(self._emit_trail(cols, head[crossed], length[crossed], 4))
+            still = ~crossed
+        else:
+            still = np.ones(act.size, dtype=bool)
+
+        # reset columns that fell fully offscreen
+        gone = still & (head - length > h + 2)
+        if gone.any():
+            gcols = act[gone]
+            keep = rng.random(gcols.size) < density
+            self._spawn(gcols[keep], density, force_active=True)
+            self.active[gcols[~keep]] = False
+        still &= ~gone
+
+        cols = act[still]
+        if cols.size:
+            length = length[still]
+            # small mutations: lively near-head half, or rarely the deep tail
+            near = (rng.random(cols.size) < 0.06) & (length > 1)
+            deep = ~near & (rng.random(cols.size) < 0.015)
+            span = np.where(near, np.maximum(1, (length * 0.5).astype(np.int64)), length)
+            mut = near | deep
+            if mut.any():
+                idx = (rng.random(int(mut.sum())) * span[mut]).astype(np.int64)
+                mcols = cols[mut]
+                self.ring[mcols, (self.head_off[mcols] + idx) % cap] = self._glyphs(mcols.size)
+
+            # full column redraw
+            parts.append(self._emit_trail(cols, head[still], length, cap))
+
+        if not parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty, empty, empty
+        ys, xs, glyph, tier, pal = (np.concatenate(p) for p in zip(*parts))
+
+        # diff against the last emitted state; lead/halo colours are re-rolled
+        # every frame, so those are always passed through for the caller's
+        # own diff cache to decide
+        key = glyph.astype(np.int64) | (tier.astype(np.int64) << _TIER_SHIFT) | (pal << _PAL_SHIFT)
+        changed = self.cache[ys, xs] != key
+        changed |= (tier == 0) | (tier == TIER_HALO)
+
+        ys, xs = ys[changed], xs[changed]
+        self.cache[ys, xs] = key[changed]
+        return ys, xs, glyph[changed], tier[changed], pal[changed]